@@ -0,0 +1,596 @@
+import os
+from dataclasses import replace
+import bpy
+from bpy_extras.io_utils import ExportHelper
+from . import bl_info
+from .ui import GITXMASS_PT_panel
+from .git_parser import fetch_metadata
+from . import git_pool
+from .loader import validate_repo, load_scene_commits, load_scene_history, scene_log_filter, find_repos
+from .async_loader import BackgroundLoad
+from .preflight import preflight, recommend_mode
+from .builder import build_tree
+from .chunked import build_tree_chunked
+from .memory import MemoryReport, no_stage
+from .gltf_export import export_layout
+from .parallel_layout import make_branch_layout
+from .layout_engines import engine_items
+from .picker import GITXMASS_OT_pick, set_index
+from .preview import show_preview, clear_preview, has_preview, preview_commits
+
+class GITXMASS_OT_generate(bpy.types.Operator):
+    bl_idname = "gitxmas.generate"
+    bl_label = "Generate"
+
+    mode: bpy.props.EnumProperty(
+        name="Mode",
+        items=[
+            ('FULL', "Full", "Build every commit with the current settings"),
+            ('DECIMATED', "Decimated", "Switch to first-parent history with simplified edges"),
+            ('PREVIEW', "Preview", "Draw points and lines only, without creating objects"),
+        ],
+        default='FULL',
+        options={'SKIP_SAVE'},
+    )
+
+    def invoke(self, context, event):
+        scene = context.scene
+        error = validate_repo(scene.repo_path)
+        if error:
+            self.report({'ERROR'}, error)
+            return {'CANCELLED'}
+        if not scene.tree_preflight:
+            return self.execute(context)
+
+        # 履歴を読む前に数だけ数えて、重すぎるときは別のモードを勧める
+        log_filter = scene_log_filter(scene)
+        options = dict(
+            simplify_edges=scene.tree_simplify_edges,
+            chunked=scene.tree_chunked,
+            chunk_size=scene.tree_chunk_size,
+            layout_engine=scene.tree_layout_engine,
+        )
+        self.estimate = preflight(scene.repo_path, log_filter, **options)
+        self.mode, self.recommended = recommend_mode(
+            scene.repo_path,
+            log_filter,
+            self.estimate,
+            scene.tree_max_objects,
+            scene.tree_max_seconds,
+            **options,
+        )
+        return context.window_manager.invoke_props_dialog(self, width=360)
+
+    def draw(self, context):
+        layout = self.layout
+        estimate = self.estimate
+        col = layout.column(align=True)
+        col.label(text=f"Commits: {estimate.commits:,}  Branch tips: {estimate.branch_tips:,}")
+        col.label(text=f"Objects: ~{estimate.objects:,}  Materials: ~{estimate.materials:,}")
+        col.label(text=f"Vertices: ~{estimate.vertices:,}")
+        col.label(text=f"Time: ~{_format_seconds(estimate.seconds)}")
+        if self.recommended is not estimate:
+            box = layout.box()
+            box.label(text="Estimate exceeds the limits", icon='ERROR')
+            box.label(text=f"Decimated: ~{self.recommended.objects:,} objects, ~{_format_seconds(self.recommended.seconds)}")
+        layout.prop(self, "mode", expand=True)
+
+    def execute(self, context):
+        scene = context.scene
+        repo_path = scene.repo_path
+        error = validate_repo(repo_path)
+        if error:
+            self.report({'ERROR'}, error)
+            return {'CANCELLED'}
+
+        if self.mode == 'PREVIEW':
+            return bpy.ops.gitxmas.preview()
+        decimated = self.mode == 'DECIMATED'
+
+        if not scene.tree_memory_report:
+            return self._generate(scene, decimated=decimated)
+        # 段階ごとのメモリ使用量を記録して JSON に書き出す
+        with MemoryReport() as report:
+            result = self._generate(scene, report, decimated)
+        if 'FINISHED' in result:
+            path = bpy.path.abspath(scene.tree_memory_report_path)
+            report.write_json(path, version=".".join(map(str, bl_info["version"])), repo=repo_path)
+            scene["git_xmas_memory"] = report.summary()
+            self.report({'INFO'}, f"Memory peak {report.peak_bytes() / 2**20:.1f} MB, {report.bytes_per_commit():.0f} bytes/commit -> {path}")
+        return result
+
+    def _generate(self, scene, report=None, decimated=False):
+        stage = report.stage if report else no_stage
+        log_filter = scene_log_filter(scene)
+        if decimated:
+            # この実行だけ第一親のみ + 辺の簡略化にする（パネルの設定は変えない）
+            log_filter = replace(log_filter, first_parent=True)
+        with stage("parse"):
+            commits, depths, stats = load_scene_history(scene, log_filter)
+            if commits:
+                # 件名はオブジェクト名に使うときだけ後からまとめて取る
+                fetch_metadata(scene.repo_path, commits, with_subjects=scene.tree_object_names == 'MESSAGE')
+        if not commits:
+            self.report({'ERROR'}, "No commits found")
+            return {'CANCELLED'}
+        if report:
+            report.commits = len(commits)
+
+        _build_scene_tree(scene, commits, depths, stage, stats, simplify_edges=True if decimated else None)
+        self.report({'INFO'}, f"{len(commits)} commits visualized")
+
+        return {'FINISHED'}
+
+
+class GITXMASS_OT_generate_forest(bpy.types.Operator):
+    """フォルダ内の全リポジトリを並列に読み込み、ツリーを並べて生成する"""
+    bl_idname = "gitxmas.generate_forest"
+    bl_label = "Generate Forest"
+
+    def invoke(self, context, event):
+        scene = context.scene
+        if not os.path.isdir(scene.forest_path):
+            self.report({'ERROR'}, "Forest folder does not exist")
+            return {'CANCELLED'}
+        repos = find_repos(scene.forest_path)
+        if not repos:
+            self.report({'ERROR'}, "No git repositories found in the folder")
+            return {'CANCELLED'}
+
+        # git の読み込みは別スレッドで行い、終わるまでタイマーで待つ
+        self.job = BackgroundLoad(
+            repos,
+            max_jobs=scene.forest_max_jobs,
+            timeout=scene.forest_timeout,
+            log_filter=scene_log_filter(scene),
+        ).start()
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.2, window=context.window)
+        wm.modal_handler_add(self)
+        self.report({'INFO'}, f"Loading {len(repos)} repositories...")
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type != 'TIMER' or not self.job.done:
+            return {'PASS_THROUGH'}
+        context.window_manager.event_timer_remove(self._timer)
+
+        if self.job.error is not None:
+            self.report({'ERROR'}, f"Loading failed: {self.job.error}")
+            return {'CANCELLED'}
+
+        scene = context.scene
+        built = 0
+        for repo_path, result in self.job.results.items():
+            if isinstance(result, Exception):
+                self.report({'WARNING'}, f"{os.path.basename(repo_path)}: {result}")
+                continue
+            if not result:
+                continue
+            # 生成したオブジェクトをまとめて横にずらして並べる
+            before = set(bpy.data.objects)
+            _build_scene_tree(scene, result, None, repo_path=repo_path)
+            offset = built * scene.forest_spacing
+            for obj in set(bpy.data.objects) - before:
+                obj.location.x += offset
+            built += 1
+
+        self.report({'INFO'}, f"{built} trees generated")
+        return {'FINISHED'}
+
+
+class GITXMASS_OT_preview(bpy.types.Operator):
+    """オブジェクトを作らずに点と線でツリーをプレビューする"""
+    bl_idname = "gitxmas.preview"
+    bl_label = "Preview"
+
+    def execute(self, context):
+        scene = context.scene
+        error = validate_repo(scene.repo_path)
+        if error:
+            self.report({'ERROR'}, error)
+            return {'CANCELLED'}
+
+        commits, depths = load_scene_commits(scene)
+        if not commits:
+            self.report({'ERROR'}, "No commits found")
+            return {'CANCELLED'}
+
+        show_preview(commits, depths, _scene_layout(scene, commits, depths))
+        self.report({'INFO'}, f"{len(commits)} commits previewed")
+        return {'FINISHED'}
+
+
+class GITXMASS_OT_convert_preview(bpy.types.Operator):
+    """プレビュー中のツリーを実際のオブジェクトに変換する"""
+    bl_idname = "gitxmas.convert_preview"
+    bl_label = "Convert Preview"
+
+    @classmethod
+    def poll(cls, context):
+        return has_preview()
+
+    def execute(self, context):
+        scene = context.scene
+        commits, depths = preview_commits()
+        clear_preview()
+        # 件名は実体化するときに初めて取る
+        fetch_metadata(scene.repo_path, commits, with_subjects=scene.tree_object_names == 'MESSAGE')
+        _build_scene_tree(scene, commits, depths)
+        self.report({'INFO'}, f"{len(commits)} commits visualized")
+        return {'FINISHED'}
+
+
+class GITXMASS_OT_clear_preview(bpy.types.Operator):
+    bl_idname = "gitxmas.clear_preview"
+    bl_label = "Clear Preview"
+
+    @classmethod
+    def poll(cls, context):
+        return has_preview()
+
+    def execute(self, context):
+        clear_preview()
+        return {'FINISHED'}
+
+
+class GITXMASS_OT_export_gltf(bpy.types.Operator, ExportHelper):
+    """シーンのオブジェクトを使わず、レイアウトから直接インスタンス化した glTF を書き出す"""
+    bl_idname = "gitxmas.export_gltf"
+    bl_label = "Export glTF"
+
+    filename_ext = ".glb"
+    filter_glob: bpy.props.StringProperty(default="*.glb", options={'HIDDEN'})
+
+    def execute(self, context):
+        scene = context.scene
+        error = validate_repo(scene.repo_path)
+        if error:
+            self.report({'ERROR'}, error)
+            return {'CANCELLED'}
+
+        commits, depths = load_scene_commits(scene)
+        if not commits:
+            self.report({'ERROR'}, "No commits found")
+            return {'CANCELLED'}
+        size = export_layout(self.filepath, _scene_layout(scene, commits, depths), commits)
+        self.report({'INFO'}, f"{len(commits)} commits exported ({size / 2**20:.1f} MB)")
+        return {'FINISHED'}
+
+
+def _format_seconds(seconds):
+    if seconds < 60:
+        return f"{seconds:.0f} s"
+    return f"{seconds / 60:.1f} min"
+
+
+def _scene_layout(scene, commits, depths):
+    return make_branch_layout(
+        commits,
+        workers=scene.tree_layout_workers,
+        engine=scene.tree_layout_engine,
+        seed=scene.tree_seed,
+        branch_spacing=scene.tree_branch_spacing,
+        commit_spacing=scene.tree_commit_spacing,
+        max_x=scene.tree_max_x,
+        max_y=scene.tree_max_y,
+        max_z=scene.tree_max_z,
+        depths=depths,
+        lane_mode=scene.tree_lane_mode,
+    )
+
+
+def _build_scene_tree(scene, commits, depths, stage=no_stage, stats=None, repo_path=None, simplify_edges=None):
+    if scene.tree_chunked:
+        positions = build_tree_chunked(
+            commits,
+            max_x=scene.tree_max_x,
+            max_y=scene.tree_max_y,
+            max_z=scene.tree_max_z,
+            branch_spacing=scene.tree_branch_spacing,
+            commit_spacing=scene.tree_commit_spacing,
+            depths=depths,
+            lane_mode=scene.tree_lane_mode,
+            seed=scene.tree_seed,
+            # フォレストではリポジトリごとにコレクションと再開の状態を分ける
+            repo_path=repo_path or scene.repo_path,
+            chunk_size=scene.tree_chunk_size,
+            save_checkpoints=scene.tree_chunk_save,
+            layout_workers=scene.tree_layout_workers,
+            layout_engine=scene.tree_layout_engine,
+            stats=stats,
+            stage=stage,
+        )
+        set_index(commits, positions)
+        return positions
+    positions = build_tree(
+        commits,
+        max_x=scene.tree_max_x,
+        max_y=scene.tree_max_y,
+        max_z=scene.tree_max_z,
+        branch_spacing=scene.tree_branch_spacing,
+        commit_spacing=scene.tree_commit_spacing,
+        depths=depths,
+        lane_mode=scene.tree_lane_mode,
+        seed=scene.tree_seed,
+        timeline=scene.tree_timeline,
+        grow_length=scene.tree_grow_length,
+        simplify_edges=scene.tree_simplify_edges if simplify_edges is None else simplify_edges,
+        bundle_merges=scene.tree_bundle_merges,
+        layout_workers=scene.tree_layout_workers,
+        layout_engine=scene.tree_layout_engine,
+        stats=stats,
+        stage=stage,
+    )
+    # ピック用の空間索引
+    set_index(commits, positions)
+    return positions
+
+
+def register():
+    bpy.types.Scene.repo_path = bpy.props.StringProperty(
+        name="Repository Path",
+        description="Path to git repository",
+        default="",
+        subtype='DIR_PATH',
+    )
+    bpy.types.Scene.tree_max_x = bpy.props.FloatProperty(
+        name="Max X",
+        description="Maximum X range",
+        default=5.0,
+        min=0.1,
+        max=50.0,
+    )
+    bpy.types.Scene.tree_max_y = bpy.props.FloatProperty(
+        name="Max Y",
+        description="Maximum Y range",
+        default=5.0,
+        min=0.1,
+        max=50.0,
+    )
+    bpy.types.Scene.tree_max_z = bpy.props.FloatProperty(
+        name="Max Z",
+        description="Maximum Z range (height)",
+        default=10.0,
+        min=0.1,
+        max=50.0,
+    )
+    bpy.types.Scene.tree_branch_spacing = bpy.props.FloatProperty(
+        name="Branch Spacing",
+        description="Spacing between branches",
+        default=1.0,
+        min=0.1,
+        max=10.0,
+    )
+    bpy.types.Scene.tree_commit_spacing = bpy.props.FloatProperty(
+        name="Commit Spacing",
+        description="Spacing between commits",
+        default=1.0,
+        min=0.1,
+        max=10.0,
+    )
+    bpy.types.Scene.tree_since = bpy.props.StringProperty(
+        name="Since",
+        description="Only commits after this date (e.g. 2025-01-01, 6 months ago)",
+        default="",
+    )
+    bpy.types.Scene.tree_until = bpy.props.StringProperty(
+        name="Until",
+        description="Only commits before this date",
+        default="",
+    )
+    bpy.types.Scene.tree_include_refs = bpy.props.StringProperty(
+        name="Include Refs",
+        description="Comma separated ref patterns to walk (e.g. heads/main, tags/v*). Empty means all refs",
+        default="",
+    )
+    bpy.types.Scene.tree_exclude_refs = bpy.props.StringProperty(
+        name="Exclude Refs",
+        description="Comma separated ref patterns to skip (e.g. heads/wip/*)",
+        default="",
+    )
+    bpy.types.Scene.tree_first_parent = bpy.props.BoolProperty(
+        name="First Parent Only",
+        description="Follow only the first parent of merge commits",
+        default=False,
+    )
+    bpy.types.Scene.tree_pathspec = bpy.props.StringProperty(
+        name="Paths",
+        description="Comma separated pathspecs; only commits touching these paths are loaded",
+        default="",
+    )
+    bpy.types.Scene.tree_use_commit_graph = bpy.props.BoolProperty(
+        name="Use Commit-Graph",
+        description="Read topology and generation numbers from .git/objects/info/commit-graph when no filter is set",
+        default=True,
+    )
+    bpy.types.Scene.tree_seed = bpy.props.IntProperty(
+        name="Seed",
+        description="Random seed for ornaments; the same seed and history always give the same tree",
+        default=0,
+        min=0,
+    )
+    bpy.types.Scene.tree_timeline = bpy.props.BoolProperty(
+        name="Growth Timeline",
+        description="Animate the tree growing commit by commit over the scene frame range",
+        default=False,
+    )
+    bpy.types.Scene.tree_grow_length = bpy.props.IntProperty(
+        name="Grow Frames",
+        description="Number of frames each commit takes to grow in",
+        default=10,
+        min=1,
+        max=250,
+    )
+    bpy.types.Scene.tree_simplify_edges = bpy.props.BoolProperty(
+        name="Simplify Edges",
+        description="Merge same-lane edges into polylines and keep one trunk connector per lane run",
+        default=False,
+    )
+    bpy.types.Scene.tree_bundle_merges = bpy.props.BoolProperty(
+        name="Bundle Merges",
+        description="Pull edges between the same pair of lanes towards a shared control point",
+        default=False,
+    )
+    bpy.types.Scene.forest_path = bpy.props.StringProperty(
+        name="Forest Folder",
+        description="Folder whose git repositories are generated side by side",
+        default="",
+        subtype='DIR_PATH',
+    )
+    bpy.types.Scene.forest_max_jobs = bpy.props.IntProperty(
+        name="Max Git Jobs",
+        description="Maximum number of git processes running at once",
+        default=4,
+        min=1,
+        max=64,
+    )
+    bpy.types.Scene.forest_timeout = bpy.props.FloatProperty(
+        name="Timeout",
+        description="Seconds before loading a single repository is abandoned",
+        default=60.0,
+        min=1.0,
+    )
+    bpy.types.Scene.forest_spacing = bpy.props.FloatProperty(
+        name="Tree Spacing",
+        description="Distance between trees in the forest",
+        default=15.0,
+        min=1.0,
+    )
+    bpy.types.Scene.tree_preflight = bpy.props.BoolProperty(
+        name="Pre-flight Check",
+        description="Count commits and estimate the cost before generating",
+        default=True,
+    )
+    bpy.types.Scene.tree_max_objects = bpy.props.IntProperty(
+        name="Max Objects",
+        description="Recommend a lighter mode when the estimated object count exceeds this",
+        default=20000,
+        min=100,
+    )
+    bpy.types.Scene.tree_max_seconds = bpy.props.FloatProperty(
+        name="Max Seconds",
+        description="Recommend a lighter mode when the estimated generation time exceeds this",
+        default=60.0,
+        min=1.0,
+    )
+    bpy.types.Scene.tree_lane_mode = bpy.props.EnumProperty(
+        name="Lane Mode",
+        description="How branches are assigned to lanes",
+        items=[
+            ('ACTIVE', "Active Lanes", "Reuse lanes after branches merge; lane count follows concurrent branches"),
+            ('FANOUT', "Fan Out", "Spread every fork by Branch Spacing without reusing lanes"),
+        ],
+        default='ACTIVE',
+    )
+    bpy.types.Scene.tree_layout_engine = bpy.props.EnumProperty(
+        name="Layout Engine",
+        description="Layout engine that places the commits (lane mode and layout workers apply to Branch Lanes only)",
+        items=engine_items(),
+        default='BRANCH',
+    )
+    bpy.types.Scene.tree_object_names = bpy.props.EnumProperty(
+        name="Object Names",
+        description="How commit spheres are named",
+        items=[
+            ('MESSAGE', "Message", "Name spheres by commit subject (fetched in a second pass)"),
+            ('HASH', "Hash", "Name spheres by short hash and skip fetching subjects"),
+        ],
+        default='MESSAGE',
+    )
+    bpy.types.Scene.tree_chunked = bpy.props.BoolProperty(
+        name="Chunked Build",
+        description="Build in fixed-size chunks, one sub-collection each, and resume from the last completed chunk (no growth animation)",
+        default=False,
+    )
+    bpy.types.Scene.tree_chunk_size = bpy.props.IntProperty(
+        name="Chunk Size",
+        description="Number of commits per chunk",
+        default=5000,
+        min=100,
+    )
+    bpy.types.Scene.tree_chunk_save = bpy.props.BoolProperty(
+        name="Save After Each Chunk",
+        description="Save the .blend file after every completed chunk (only when it has been saved before)",
+        default=False,
+    )
+    bpy.types.Scene.tree_activity = bpy.props.BoolProperty(
+        name="Activity Styling",
+        description="Color spheres by first-parent branch, and size spheres and place ornaments by weekly activity (skips the commit-graph)",
+        default=False,
+    )
+    bpy.types.Scene.tree_layout_workers = bpy.props.IntProperty(
+        name="Layout Workers",
+        description="Lay out independent parts of large histories in this many processes (0 or 1: single process)",
+        default=0,
+        min=0,
+        max=64,
+    )
+    bpy.types.Scene.tree_memory_report = bpy.props.BoolProperty(
+        name="Memory Report",
+        description="Record the tracemalloc peak and datablock counts per stage while generating",
+        default=False,
+    )
+    bpy.types.Scene.tree_memory_report_path = bpy.props.StringProperty(
+        name="Report File",
+        description="JSON file the memory report is written to",
+        default="//git_xmas_memory.json",
+        subtype='FILE_PATH',
+    )
+    bpy.utils.register_class(GITXMASS_OT_generate)
+    bpy.utils.register_class(GITXMASS_OT_generate_forest)
+    bpy.utils.register_class(GITXMASS_OT_pick)
+    bpy.utils.register_class(GITXMASS_OT_preview)
+    bpy.utils.register_class(GITXMASS_OT_convert_preview)
+    bpy.utils.register_class(GITXMASS_OT_clear_preview)
+    bpy.utils.register_class(GITXMASS_OT_export_gltf)
+    bpy.utils.register_class(GITXMASS_PT_panel)
+
+
+def unregister():
+    del bpy.types.Scene.repo_path
+    del bpy.types.Scene.tree_max_x
+    del bpy.types.Scene.tree_max_y
+    del bpy.types.Scene.tree_max_z
+    del bpy.types.Scene.tree_branch_spacing
+    del bpy.types.Scene.tree_commit_spacing
+    del bpy.types.Scene.tree_since
+    del bpy.types.Scene.tree_until
+    del bpy.types.Scene.tree_include_refs
+    del bpy.types.Scene.tree_exclude_refs
+    del bpy.types.Scene.tree_first_parent
+    del bpy.types.Scene.tree_pathspec
+    del bpy.types.Scene.tree_use_commit_graph
+    del bpy.types.Scene.tree_object_names
+    del bpy.types.Scene.tree_lane_mode
+    del bpy.types.Scene.tree_layout_engine
+    del bpy.types.Scene.tree_preflight
+    del bpy.types.Scene.tree_max_objects
+    del bpy.types.Scene.tree_max_seconds
+    del bpy.types.Scene.forest_path
+    del bpy.types.Scene.forest_max_jobs
+    del bpy.types.Scene.forest_timeout
+    del bpy.types.Scene.forest_spacing
+    del bpy.types.Scene.tree_simplify_edges
+    del bpy.types.Scene.tree_bundle_merges
+    del bpy.types.Scene.tree_seed
+    del bpy.types.Scene.tree_timeline
+    del bpy.types.Scene.tree_grow_length
+    del bpy.types.Scene.tree_chunked
+    del bpy.types.Scene.tree_chunk_size
+    del bpy.types.Scene.tree_chunk_save
+    del bpy.types.Scene.tree_activity
+    del bpy.types.Scene.tree_layout_workers
+    del bpy.types.Scene.tree_memory_report
+    del bpy.types.Scene.tree_memory_report_path
+    bpy.utils.unregister_class(GITXMASS_PT_panel)
+    clear_preview()
+    # 常駐させた git プロセスを終了する
+    git_pool.shutdown()
+    bpy.utils.unregister_class(GITXMASS_OT_export_gltf)
+    bpy.utils.unregister_class(GITXMASS_OT_clear_preview)
+    bpy.utils.unregister_class(GITXMASS_OT_convert_preview)
+    bpy.utils.unregister_class(GITXMASS_OT_preview)
+    bpy.utils.unregister_class(GITXMASS_OT_pick)
+    bpy.utils.unregister_class(GITXMASS_OT_generate_forest)
+    bpy.utils.unregister_class(GITXMASS_OT_generate)
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+from .git_parser import log_command, parse_log_line
+
+
+async def load_repo_async(repo_path, semaphore, timeout=60.0, log_filter=None):
+    """1リポジトリ分の git log を非同期に読み、行ごとに load_commits と同じパーサに通す"""
+    async with semaphore:
+        proc = await asyncio.create_subprocess_exec(
+            *log_command(log_filter),
+            cwd=repo_path,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+        async def read():
+            commits = []
+            async for line in proc.stdout:
+                line = line.decode('utf-8', errors='replace').rstrip("\n")
+                if line:
+                    commits.append(parse_log_line(line))
+            stderr = await proc.stderr.read()
+            if await proc.wait() != 0:
+                raise RuntimeError(stderr.decode('utf-8', errors='replace').strip() or "git log failed")
+            return commits
+
+        try:
+            return await asyncio.wait_for(read(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise TimeoutError(f"git log timed out after {timeout:g}s")
+
+
+async def load_repos_async(repo_paths, max_jobs=4, timeout=60.0, log_filter=None):
+    """同時に動く git の数を max_jobs に抑えて複数リポジトリを読む
+
+    戻り値は {repo_path: commits または例外}。
+    """
+    semaphore = asyncio.Semaphore(max_jobs)
+    results = await asyncio.gather(
+        *(load_repo_async(path, semaphore, timeout, log_filter) for path in repo_paths),
+        return_exceptions=True,
+    )
+    return dict(zip(repo_paths, results))
+
+
+def load_repos(repo_paths, max_jobs=4, timeout=60.0, log_filter=None):
+    return asyncio.run(load_repos_async(repo_paths, max_jobs, timeout, log_filter))
+
+
+class BackgroundLoad:
+    """load_repos を別スレッドで動かす（Blender の UI を止めない）
+
+    メインスレッドからは done を見て、終わったら results を使う。
+    """
+    def __init__(self, repo_paths, max_jobs=4, timeout=60.0, log_filter=None):
+        self.repo_paths = list(repo_paths)
+        self.results = None
+        self.error = None
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(max_jobs, timeout, log_filter),
+            daemon=True,
+        )
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    @property
+    def done(self):
+        return not self._thread.is_alive() and (self.results is not None or self.error is not None)
+
+    def _run(self, max_jobs, timeout, log_filter):
+        try:
+            self.results = load_repos(self.repo_paths, max_jobs, timeout, log_filter)
+        except Exception as e:
+            self.error = e
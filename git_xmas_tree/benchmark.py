@@ -0,0 +1,127 @@
+"""登録されたレイアウトエンジンを合成履歴と実リポジトリで比べる（Blender 不要）
+
+    python -m git_xmas_tree.benchmark [REPO ...] --sizes 10000 100000 --repeat 3 --json bench.json
+
+時間は tracemalloc を止めた状態で repeat 回測った最短、メモリは別の1回で
+測った tracemalloc のピーク。どちらも1万コミットあたりに直して表にする。
+GraphArrays への変換は全エンジン共通なので graph の行として別に測る。
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from .commit_graph import load_commits_from_graph
+from .git_parser import Commit
+from .layout_engines import ENGINES, GraphArrays, get_engine
+
+PER_COMMITS = 10000
+
+
+def synthetic_history(n, branch_rate=0.05, merge_rate=0.1, seed=0):
+    """ブランチの分岐とマージを乱数で混ぜた、古い順の n コミット"""
+    rng = random.Random(seed)
+    tips = []  # 開いているブランチの先端
+    commits = []
+    for i in range(n):
+        commit_hash = f"{rng.getrandbits(160):040x}"
+        parents = []
+        lane = None
+        if tips:
+            lane = rng.randrange(len(tips))
+            parents.append(tips[lane])
+            if len(tips) > 1 and rng.random() < merge_rate:
+                # 別のブランチをマージして閉じる
+                other = rng.randrange(len(tips) - 1)
+                other += other >= lane
+                parents.append(tips.pop(other))
+                lane -= other < lane
+        if lane is None or rng.random() < branch_rate:
+            tips.append(commit_hash)
+        else:
+            tips[lane] = commit_hash
+        commits.append(Commit(commit_hash, parents, 1_600_000_000 + i * 600, "", ""))
+    return commits
+
+
+def measure(func, repeat=3):
+    """(最短の秒数, tracemalloc のピークのバイト数)"""
+    seconds = float("inf")
+    for _ in range(repeat):
+        began = time.perf_counter()
+        func()
+        seconds = min(seconds, time.perf_counter() - began)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def bench_history(name, commits, depths=None, engines=None, repeat=3):
+    """1つの履歴について graph と各エンジンの行を返す"""
+    rows = []
+
+    def row(kind, seconds, peak):
+        scale = PER_COMMITS / max(1, len(commits))
+        rows.append({
+            "history": name,
+            "commits": len(commits),
+            "engine": kind,
+            "seconds": seconds,
+            "seconds_per_10k": seconds * scale,
+            "peak_bytes": peak,
+            "peak_bytes_per_10k": peak * scale,
+        })
+
+    row("graph", *measure(lambda: GraphArrays.from_commits(commits, depths), repeat))
+    graph = GraphArrays.from_commits(commits, depths)
+    for engine in engines or list(ENGINES):
+        layout_engine = get_engine(engine)
+        row(engine, *measure(lambda: layout_engine.layout(graph), repeat))
+    return rows
+
+
+def format_table(rows):
+    lines = [f"{'history':<24} {'commits':>9} {'engine':<9} {'s/10k':>9} {'MB/10k':>9} {'peak MB':>9}"]
+    for r in rows:
+        lines.append(
+            f"{r['history'][-24:]:<24} {r['commits']:>9,} {r['engine']:<9} "
+            f"{r['seconds_per_10k']:>9.3f} {r['peak_bytes_per_10k'] / 2**20:>9.2f} {r['peak_bytes'] / 2**20:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the registered layout engines on synthetic and real histories")
+    parser.add_argument("repos", nargs="*", help="Repositories to lay out in addition to the synthetic histories")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10000, 100000], help="Commit counts of the synthetic histories")
+    parser.add_argument("--engines", nargs="*", choices=list(ENGINES), help="Engines to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs per engine (the fastest is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the rows to this JSON file")
+    args = parser.parse_args(argv)
+
+    rows = []
+    for size in args.sizes:
+        commits = synthetic_history(size, seed=args.seed)
+        rows += bench_history(f"synthetic-{size}", commits, engines=args.engines, repeat=args.repeat)
+    for repo in args.repos:
+        commits, depths = load_commits_from_graph(repo)
+        if not commits:
+            print(f"{repo}: no commits", file=sys.stderr)
+            continue
+        rows += bench_history(repo, commits, depths, engines=args.engines, repeat=args.repeat)
+
+    print(format_table(rows))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,11 @@
 import bpy
 import random
 import math
-from .layout import BranchLayout
+import numpy as np
+from .memory import no_stage
+from .parallel_layout import make_branch_layout
+from .timeline import growth_frames, bake_growth, bake_polyline_growth
+from .edges import plan_edges, bundle_links
 from .materials import (
     create_branch_material,
     create_trunk_material,
@@ -11,57 +15,142 @@ from .materials import (
     create_commit_material,
 )
 
+TRUNK_RADIUS = 0.15
+SPHERE_RADIUS = 0.18
 
-def build_tree(commits, max_x=5.0, max_y=5.0, max_z=10.0, branch_spacing=1.0, commit_spacing=1.0):
-    layout = BranchLayout(
+
+def build_tree(commits, max_x=5.0, max_y=5.0, max_z=10.0, branch_spacing=1.0, commit_spacing=1.0, depths=None, lane_mode='ACTIVE', seed=0, timeline=False, grow_length=10, simplify_edges=False, bundle_merges=False, layout_workers=0, layout_engine='BRANCH', stats=None, stage=no_stage):
+    layout = make_branch_layout(
         commits,
+        workers=layout_workers,
+        engine=layout_engine,
+        seed=seed,
         branch_spacing=branch_spacing,
         commit_spacing=commit_spacing,
         max_x=max_x,
         max_y=max_y,
         max_z=max_z,
+        depths=depths,
+        lane_mode=lane_mode,
+        stage=stage,
     )
     positions = {}
+    with stage("build"):
+        # 装飾の乱数も実行ごとの生成器から取り、同じ入力なら同じツリーにする
+        rng = random.Random(seed)
+        # 下流のキャッシュ（レイアウトファイル・レンダリング結果など）のキー
+        bpy.context.scene["git_xmas_fingerprint"] = layout.fingerprint(seed=seed, activity=stats is not None)
+    
+        # マテリアルを作成
+        branch_mat = create_branch_material()
+
+        # タイムライン用: (オブジェクト, 現れるコミットのインデックス)
+        grow_targets = []
+        # まとめたポリラインは点ごとに伸ばす: (オブジェクト, 点のコミットのインデックス)
+        chain_targets = []
+
+        # 活動の統計があれば、色は最初の親で辿ったブランチ、大きさはその週の活発さで決める
+        activity = stats.activity() if stats is not None else None
+
+        # コミット（球）
+        commit_objects = []
+        for i, c in enumerate(commits):
+            pos = layout.position(c, i)
+            positions[c.hash] = pos
+
+            bpy.ops.mesh.primitive_uv_sphere_add(
+                radius=SPHERE_RADIUS * sphere_scale(activity, i),
+                location=pos,
+            )
+            # 球の名前をコミットメッセージに設定
+            obj = bpy.context.active_object
+            obj.name = c.message if c.message else c.hash[:7]
+        
+            # コミットにマテリアルを適用
+            commit_mat = create_commit_material(stats.branch_name(i) if stats is not None else c.branch)
+            obj.data.materials.append(commit_mat)
+            commit_objects.append(obj)
+            grow_targets.append((obj, i))
+
+        # 枝（親子）
+        if simplify_edges:
+            # 同じレーンの連続した辺は1本のポリラインにまとめる
+            plan = plan_edges(layout.parent_indices, layout.lanes)
+            for chain in plan.chains:
+                c = commits[chain[-1]]
+                branch_obj = _make_polyline([positions[commits[i].hash] for i in chain], c.branch)
+                branch_obj.data.materials.append(branch_mat)
+                chain_targets.append((branch_obj, chain))
+            if bundle_merges:
+                link_lines = bundle_links(plan.links, layout.positions_array(), layout.lanes)
+            else:
+                link_lines = [(positions[commits[p].hash], positions[commits[i].hash]) for p, i in plan.links]
+            for (p, i), points in zip(plan.links, link_lines):
+                branch_obj = _make_polyline([tuple(point) for point in points], commits[i].branch)
+                branch_obj.data.materials.append(branch_mat)
+                grow_targets.append((branch_obj, i))
+            connector_indices = plan.connectors
+        else:
+            for i, c in enumerate(commits):
+                for p in c.parents:
+                    if p in positions:
+                        branch_obj = _make_branch(positions[p], positions[c.hash], c.branch)
+                        if branch_obj:
+                            branch_obj.data.materials.append(branch_mat)
+                            grow_targets.append((branch_obj, i))
+            connector_indices = [i for i, c in enumerate(commits) if layout.commit_lanes.get(c.hash, 0) != 0]
+    
+        # 他のブランチから幹に枝を繋げる（中央以外のブランチ）
+        for i in connector_indices:
+            c = commits[i]
+            pos = positions[c.hash]
+            # 幹の表面への接続点（球より下から上に角度をつけて伸びる）
+            # 球の位置に対して下方向にオフセットを付ける
+            z_offset = 0.5  # 枝の角度を調整する値（大きいほど急角度）
+            trunk_surface_pos = (TRUNK_RADIUS, 0, pos[2] - z_offset)
+            trunk_branch_obj = _make_branch(trunk_surface_pos, pos, c.branch, radius=0.02)
+            if trunk_branch_obj:
+                trunk_branch_obj.data.materials.append(branch_mat)
+                grow_targets.append((trunk_branch_obj, i))
+    
+        # 幹・オーナメント・ライト・星
+        add_decorations(commits, [positions[c.hash] for c in commits], max_x, rng, grow_targets, weights=activity)
     
-    # マテリアルを作成
-    branch_mat = create_branch_material()
+        # 成長アニメーション（コミット時刻の順に枝と球が現れる）
+        if timeline and grow_targets:
+            scene = bpy.context.scene
+            frames = growth_frames([c.time for c in commits], scene.frame_start, scene.frame_end)
+            objects = [obj for obj, _ in grow_targets]
+            indices = np.fromiter((idx for _, idx in grow_targets), dtype=np.int64, count=len(grow_targets))
+            bake_growth(objects, frames[indices], grow_length)
+            if chain_targets:
+                bake_polyline_growth([obj for obj, _ in chain_targets], [frames[chain] for _, chain in chain_targets], grow_length)
+
+    return positions
+
+
+def sphere_scale(activity, index):
+    """活発な週のコミットほど球を大きくする（統計が無ければ 1）"""
+    if activity is None:
+        return 1.0
+    return 0.7 + 0.6 * float(activity[index])
+
+
+def add_decorations(commits, points, max_x, rng, grow_targets=None, weights=None):
+    """幹・オーナメント・ライト・星を追加する（points は commits と同じ順の座標）
+
+    weights を渡すと、重みの大きいコミットほどオーナメントが付きやすくなる。
+    """
     trunk_mat = create_trunk_material()
     ornament_colors = ['red', 'gold', 'blue', 'silver', 'purple', 'green']
     ornament_mats = {color: create_ornament_material(color) for color in ornament_colors}
     light_mat = create_light_material()
     star_mat = create_star_material()
 
-    # コミット（球）
-    commit_objects = []
-    for i, c in enumerate(commits):
-        pos = layout.position(c, i)
-        positions[c.hash] = pos
-
-        bpy.ops.mesh.primitive_uv_sphere_add(
-            radius=0.18,
-            location=pos,
-        )
-        # 球の名前をコミットメッセージに設定
-        obj = bpy.context.active_object
-        obj.name = c.message if c.message else c.hash[:7]
-        
-        # コミットにマテリアルを適用
-        commit_mat = create_commit_material(c.branch)
-        obj.data.materials.append(commit_mat)
-        commit_objects.append(obj)
-
-    # 枝（親子）
-    for c in commits:
-        for p in c.parents:
-            if p in positions:
-                branch_obj = _make_branch(positions[p], positions[c.hash], c.branch)
-                if branch_obj:
-                    branch_obj.data.materials.append(branch_mat)
-    
     # 幹を追加
     # 実際のコミット位置から高さを計算
-    if positions:
-        z_coords = [pos[2] for pos in positions.values()]
+    if points:
+        z_coords = [pos[2] for pos in points]
         min_z = min(z_coords)
         max_z = max(z_coords)
         trunk_height = max_z - min_z + 1.0  # 少し余裕を持たせる
@@ -70,9 +159,8 @@ def build_tree(commits, max_x=5.0, max_y=5.0, max_z=10.0, branch_spacing=1.0, co
         trunk_height = 2.0
         trunk_center_z = 0.0
     
-    trunk_radius = 0.15
     bpy.ops.mesh.primitive_cylinder_add(
-        radius=trunk_radius,
+        radius=TRUNK_RADIUS,
         depth=trunk_height,
         location=(0, 0, trunk_center_z)
     )
@@ -80,27 +168,19 @@ def build_tree(commits, max_x=5.0, max_y=5.0, max_z=10.0, branch_spacing=1.0, co
     trunk.name = "Trunk"
     trunk.data.materials.append(trunk_mat)
     
-    # 他のブランチから幹に枝を繋げる
-    for c in commits:
-        lane = layout.commit_lanes.get(c.hash, 0)
-        if lane != 0:  # 中央以外のブランチ
-            pos = positions[c.hash]
-            # 幹の表面への接続点（球より下から上に角度をつけて伸びる）
-            # 球の位置に対して下方向にオフセットを付ける
-            z_offset = 0.5  # 枝の角度を調整する値（大きいほど急角度）
-            trunk_surface_pos = (trunk_radius, 0, pos[2] - z_offset)
-            trunk_branch_obj = _make_branch(trunk_surface_pos, pos, c.branch, radius=0.02)
-            if trunk_branch_obj:
-                trunk_branch_obj.data.materials.append(branch_mat)
-    
     # オーナメントを追加（コミットの一部をランダムに選択）
     num_ornaments = min(len(commits) // 3, 30)  # コミット数の1/3、最大30個
-    ornament_indices = random.sample(range(len(commits)), num_ornaments)
+    if weights is None:
+        ornament_indices = rng.sample(range(len(commits)), num_ornaments)
+    else:
+        # 重み付きの非復元抽出（キー u^(1/w) の大きい順）
+        keys = np.random.default_rng(rng.getrandbits(64)).random(len(commits)) ** (1.0 / np.asarray(weights))
+        ornament_indices = np.argsort(-keys, kind='stable')[:num_ornaments].tolist()
     for idx in ornament_indices:
-        pos = positions[commits[idx].hash]
+        pos = points[idx]
         # コミットの少し下にオーナメントを配置
         ornament_pos = (pos[0], pos[1], pos[2] - 0.3)
-        color = random.choice(ornament_colors)
+        color = rng.choice(ornament_colors)
         
         bpy.ops.mesh.primitive_uv_sphere_add(
             radius=0.12,
@@ -109,6 +189,8 @@ def build_tree(commits, max_x=5.0, max_y=5.0, max_z=10.0, branch_spacing=1.0, co
         ornament = bpy.context.active_object
         ornament.name = f"Ornament_{color}"
         ornament.data.materials.append(ornament_mats[color])
+        if grow_targets is not None:
+            grow_targets.append((ornament, idx))
     
     # ライトを追加（螺旋状に配置）
     num_lights = 20
@@ -130,8 +212,7 @@ def build_tree(commits, max_x=5.0, max_y=5.0, max_z=10.0, branch_spacing=1.0, co
         light.data.materials.append(light_mat)
     
     # 頂上に星を追加
-    if positions:
-        z_coords = [pos[2] for pos in positions.values()]
+    if points:
         top_z = max(z_coords) + 0.5
     else:
         top_z = trunk_height / 2 + 0.5
@@ -155,14 +236,16 @@ def build_tree(commits, max_x=5.0, max_y=5.0, max_z=10.0, branch_spacing=1.0, co
 
 
 def _make_branch(p1, p2, branch_name="", radius=0.03):
+    return _make_polyline([p1, p2], branch_name, radius)
+
+
+def _make_polyline(points, branch_name="", radius=0.03):
     curve = bpy.data.curves.new("BranchCurve", type="CURVE")
     curve.dimensions = '3D'
 
     spline = curve.splines.new("POLY")
-    spline.points.add(1)
-
-    spline.points[0].co = (*p1, 1)
-    spline.points[1].co = (*p2, 1)
+    spline.points.add(len(points) - 1)
+    spline.points.foreach_set("co", [v for p in points for v in (*p, 1)])
 
     curve.bevel_depth = radius
     curve.bevel_resolution = 3
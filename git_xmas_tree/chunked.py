@@ -0,0 +1,228 @@
+"""大きな履歴をチャンクごとに組み立てる（途中で止まっても続きから再開できる）
+
+コミットを chunk_size 件ずつに分け、チャンクごとに球をまとめた1メッシュと
+枝をまとめた1カーブをサブコレクションに作る。完了したチャンク数はシーンの
+カスタムプロパティにリポジトリごとに記録し、同じ入力で再実行したときは残りの
+チャンクだけを作る。コレクションもリポジトリごとに分けるので、フォレストの
+ように複数のツリーを並べても互いを消さない。
+"""
+import hashlib
+import os
+import random
+import numpy as np
+import bpy
+from .parallel_layout import make_branch_layout
+from .memory import no_stage
+from .builder import add_decorations, SPHERE_RADIUS, TRUNK_RADIUS
+from .geometry import sphere_template
+from .materials import branch_color, create_branch_material, create_attribute_commit_material
+
+STATE_KEY = "git_xmas_chunks"
+ROOT_COLLECTION = "GitXmasTree"
+COLOR_ATTRIBUTE = "commit_color"
+
+
+def build_tree_chunked(commits, max_x=5.0, max_y=5.0, max_z=10.0, branch_spacing=1.0, commit_spacing=1.0, depths=None, lane_mode='ACTIVE', seed=0, repo_path="", chunk_size=5000, save_checkpoints=False, layout_workers=0, layout_engine='BRANCH', stats=None, stage=no_stage):
+    layout = make_branch_layout(
+        commits,
+        workers=layout_workers,
+        engine=layout_engine,
+        seed=seed,
+        branch_spacing=branch_spacing,
+        commit_spacing=commit_spacing,
+        max_x=max_x,
+        max_y=max_y,
+        max_z=max_z,
+        depths=depths,
+        lane_mode=lane_mode,
+        stage=stage,
+    )
+    with stage("build"):
+        return _build_chunks(layout, commits, max_x, seed, repo_path, chunk_size, save_checkpoints, stats)
+
+
+def _build_chunks(layout, commits, max_x, seed, repo_path, chunk_size, save_checkpoints, stats):
+    scene = bpy.context.scene
+    scene["git_xmas_fingerprint"] = layout.fingerprint(seed=seed, activity=stats is not None)
+    fingerprint = layout.fingerprint(seed=seed, chunk_size=chunk_size, activity=stats is not None)
+    total = (len(commits) + chunk_size - 1) // chunk_size
+
+    key = repo_key(repo_path)
+    root, done = _resume_point(scene, key, repo_path, fingerprint)
+    # 前回途中で止まったチャンクの残骸は作り直す
+    for k in range(done, total):
+        _remove_collection(bpy.data.collections.get(chunk_name(key, k)))
+
+    positions = layout.positions_array()
+    lanes = np.asarray(layout.lanes)
+    branch_mat = create_branch_material()
+    commit_mat = create_attribute_commit_material(COLOR_ATTRIBUTE)
+    sphere_verts, sphere_tris = sphere_template(SPHERE_RADIUS)
+    if stats is not None:
+        activity = stats.activity()
+        scales = 0.7 + 0.6 * activity
+        names = [stats.branch_name(i) for i in range(len(commits))]
+    else:
+        activity = None
+        scales = np.ones(len(commits))
+        names = [c.branch for c in commits]
+
+    for k in range(done, total):
+        lo, hi = k * chunk_size, min(len(commits), (k + 1) * chunk_size)
+        collection = bpy.data.collections.new(chunk_name(key, k))
+        root.children.link(collection)
+        _build_chunk_spheres(collection, k, names[lo:hi], positions[lo:hi], scales[lo:hi], sphere_verts, sphere_tris, commit_mat)
+        _build_chunk_branches(collection, k, layout.parent_indices, lanes, positions, lo, hi, branch_mat)
+        # チャンクが揃ってから進捗を記録する
+        _set_state(scene, key, {"fingerprint": fingerprint, "done": k + 1, "total": total, "decorated": False})
+        if save_checkpoints and bpy.data.filepath:
+            bpy.ops.wm.save_mainfile()
+
+    if not _get_state(scene, key).get("decorated"):
+        _with_active_collection(root, lambda: add_decorations(commits, positions.tolist(), max_x, random.Random(seed), weights=activity))
+        _set_state(scene, key, {"fingerprint": fingerprint, "done": total, "total": total, "decorated": True})
+
+    return {c.hash: tuple(pos) for c, pos in zip(commits, positions.tolist())}
+
+
+def repo_key(repo_path):
+    """リポジトリの絶対パスから作る短いキー（状態とコレクション名に使う）"""
+    return hashlib.sha1(os.path.abspath(repo_path).encode()).hexdigest()[:8]
+
+
+def root_name(key):
+    return f"{ROOT_COLLECTION}_{key}"
+
+
+def chunk_name(key, k):
+    return f"GitXmasChunk_{key}_{k:04d}"
+
+
+def chunk_progress(scene, repo_path):
+    """repo_path の (完了チャンク数, 全チャンク数)。記録が無ければ None"""
+    state = _get_state(scene, repo_key(repo_path))
+    if not state:
+        return None
+    return state["done"], state["total"]
+
+
+def _get_state(scene, key):
+    states = scene.get(STATE_KEY)
+    if not states or key not in states:
+        return {}
+    return states[key]
+
+
+def _set_state(scene, key, state):
+    states = scene.get(STATE_KEY)
+    if states is None or "fingerprint" in states:
+        # リポジトリごとに分ける前の形式（1つ分の状態）は捨てる
+        scene[STATE_KEY] = {}
+        states = scene[STATE_KEY]
+    states[key] = state
+
+
+def _resume_point(scene, key, repo_path, fingerprint):
+    state = _get_state(scene, key)
+    root = bpy.data.collections.get(root_name(key))
+    if state and root is not None and state.get("fingerprint") == fingerprint:
+        return root, state["done"]
+    # 入力が変わっていれば、このリポジトリの分だけ最初から作る
+    _remove_collection(root)
+    root = bpy.data.collections.new(root_name(key))
+    root["git_xmas_repo"] = os.path.abspath(repo_path)
+    scene.collection.children.link(root)
+    _set_state(scene, key, {"fingerprint": fingerprint, "done": 0, "total": 0, "decorated": False})
+    return root, 0
+
+
+def _remove_collection(collection):
+    if collection is None:
+        return
+    for child in list(collection.children):
+        _remove_collection(child)
+    for obj in list(collection.objects):
+        data = obj.data
+        bpy.data.objects.remove(obj)
+        if data is not None and data.users == 0:
+            if isinstance(data, bpy.types.Mesh):
+                bpy.data.meshes.remove(data)
+            elif isinstance(data, bpy.types.Curve):
+                bpy.data.curves.remove(data)
+    bpy.data.collections.remove(collection)
+
+
+def _build_chunk_spheres(collection, k, branch_names, positions, scales, sphere_verts, sphere_tris, material):
+    """チャンク内の球を1メッシュにまとめる（テンプレートを拡大して各コミット位置へ平行移動）"""
+    n, v, t = len(branch_names), len(sphere_verts), len(sphere_tris)
+    scaled = sphere_verts[None, :, :] * scales.astype(np.float32)[:, None, None]
+    verts = (positions[:, None, :].astype(np.float32) + scaled).reshape(-1, 3)
+    tris = (sphere_tris[None, :, :] + (np.arange(n, dtype=np.int32) * v)[:, None, None]).reshape(-1)
+
+    mesh = bpy.data.meshes.new(f"GitXmasCommits_{k:04d}")
+    mesh.vertices.add(n * v)
+    mesh.vertices.foreach_set("co", verts.ravel())
+    mesh.loops.add(n * t * 3)
+    mesh.loops.foreach_set("vertex_index", tris)
+    mesh.polygons.add(n * t)
+    mesh.polygons.foreach_set("loop_start", np.arange(0, n * t * 3, 3, dtype=np.int32))
+    mesh.update()
+
+    # ブランチごとの色は頂点カラーで持つ（チャンクにつきマテリアル1つ）
+    colors = np.array([(*branch_color(name), 1.0) for name in branch_names], dtype=np.float32)
+    attribute = mesh.color_attributes.new(COLOR_ATTRIBUTE, 'FLOAT_COLOR', 'POINT')
+    attribute.data.foreach_set("color", np.repeat(colors, v, axis=0).ravel())
+    mesh.materials.append(material)
+
+    obj = bpy.data.objects.new(f"GitXmasCommits_{k:04d}", mesh)
+    collection.objects.link(obj)
+    return obj
+
+
+def _build_chunk_branches(collection, k, parent_indices, lanes, positions, lo, hi, material):
+    """チャンク内のコミットへ伸びる枝と幹への接続を1カーブにまとめる"""
+    curve = bpy.data.curves.new(f"GitXmasBranches_{k:04d}", type="CURVE")
+    curve.dimensions = '3D'
+    curve.bevel_depth = 0.03
+    curve.bevel_resolution = 3
+
+    for i in range(lo, hi):
+        child = positions[i]
+        for p in parent_indices[i]:
+            _add_segment(curve, positions[p], child, 1.0)
+        if lanes[i] != 0:
+            # 幹への接続は細くする（bevel_depth 0.03 に対して 0.02）
+            _add_segment(curve, (TRUNK_RADIUS, 0, child[2] - 0.5), child, 2 / 3)
+
+    curve.materials.append(material)
+    obj = bpy.data.objects.new(f"GitXmasBranches_{k:04d}", curve)
+    collection.objects.link(obj)
+    return obj
+
+
+def _add_segment(curve, p1, p2, radius):
+    spline = curve.splines.new("POLY")
+    spline.points.add(1)
+    spline.points.foreach_set("co", (p1[0], p1[1], p1[2], 1, p2[0], p2[1], p2[2], 1))
+    spline.points.foreach_set("radius", (radius, radius))
+
+
+def _with_active_collection(collection, func):
+    # bpy.ops で追加するオブジェクトを collection に入れる
+    view_layer = bpy.context.view_layer
+    previous = view_layer.active_layer_collection
+    view_layer.active_layer_collection = _find_layer_collection(view_layer.layer_collection, collection.name)
+    try:
+        return func()
+    finally:
+        view_layer.active_layer_collection = previous
+
+
+def _find_layer_collection(layer_collection, name):
+    if layer_collection.name == name:
+        return layer_collection
+    for child in layer_collection.children:
+        found = _find_layer_collection(child, name)
+        if found is not None:
+            return found
+    return None
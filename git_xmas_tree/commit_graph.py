@@ -0,0 +1,209 @@
+import mmap
+import os
+import struct
+import subprocess
+from .git_parser import Commit, load_topology
+
+# commit-graph ファイルフォーマット
+# https://git-scm.com/docs/gitformat-commit-graph
+SIGNATURE = b"CGPH"
+CHUNK_FANOUT = b"OIDF"
+CHUNK_OID_LOOKUP = b"OIDL"
+CHUNK_COMMIT_DATA = b"CDAT"
+CHUNK_EXTRA_EDGES = b"EDGE"
+
+GRAPH_PARENT_NONE = 0x70000000
+GRAPH_EXTRA_EDGES_NEEDED = 0x80000000
+GRAPH_LAST_EDGE = 0x80000000
+
+HASH_LENGTHS = {1: 20, 2: 32}
+
+
+class CommitGraph:
+    """commit-graph（チェーン含む）から読み出したトポロジ
+
+    位置 i のコミットについて oids[i], parents[i]（位置のタプル）,
+    generations[i]（トポロジカルレベル, ルートが 1）, times[i] を持つ。
+    """
+    def __init__(self, oids, parents, generations, times):
+        self.oids = oids
+        self.parents = parents
+        self.generations = generations
+        self.times = times
+
+    def __len__(self):
+        return len(self.oids)
+
+    def to_commits(self, positions=None):
+        """世代順（親が先）に並べた Commit のリスト。メッセージと ref は空のまま
+
+        positions を渡すとその位置のコミットだけを返す（reachable() の結果など）。
+        """
+        if positions is None:
+            positions = range(len(self.oids))
+        order = sorted(positions, key=lambda i: (self.generations[i], self.times[i]))
+        oids = self.oids
+        return [
+            Commit(oids[i], [oids[p] for p in self.parents[i]], self.times[i], "", "")
+            for i in order
+        ]
+
+    def depths(self, positions=None):
+        """BranchLayout の深さ（ルートが 0）"""
+        if positions is None:
+            positions = range(len(self.oids))
+        return {self.oids[i]: self.generations[i] - 1 for i in positions}
+
+    def reachable(self, tips):
+        """tips から親を辿れるコミットの位置（昇順）
+
+        削除したブランチのコミットが古いグラフに残っていても描かないよう、先端から
+        辿れるものだけに絞る。グラフに無い先端があれば None（グラフが古い）。
+        """
+        index = {oid: i for i, oid in enumerate(self.oids)}
+        stack = []
+        for oid in tips:
+            i = index.get(oid)
+            if i is None:
+                return None
+            stack.append(i)
+        seen = bytearray(len(self.oids))
+        while stack:
+            i = stack.pop()
+            if seen[i]:
+                continue
+            seen[i] = 1
+            stack.extend(p for p in self.parents[i] if not seen[p])
+        return [i for i in range(len(self.oids)) if seen[i]]
+
+
+def ref_tips(repo_path):
+    """全 ref と HEAD（detached HEAD を含む）が指すコミット"""
+    refs = subprocess.check_output(
+        ["git", "for-each-ref", "--format=%(objecttype) %(objectname) %(*objecttype) %(*objectname)"],
+        cwd=repo_path,
+        encoding="utf-8",
+        text=True,
+    ).splitlines()
+    tips = set()
+    for ref in refs:
+        parts = ref.split()
+        # 注釈付きタグは剥がした先を見る
+        kind, oid = (parts[2], parts[3]) if len(parts) == 4 else (parts[0], parts[1])
+        if kind == "commit":
+            tips.add(oid)
+    head = subprocess.run(
+        ["git", "rev-parse", "--verify", "--quiet", "HEAD^{commit}"],
+        cwd=repo_path,
+        capture_output=True,
+        encoding="utf-8",
+        text=True,
+    )
+    if head.returncode == 0:
+        tips.add(head.stdout.strip())
+    return tips
+
+
+def find_graph_files(repo_path):
+    """git と同じ優先順位で commit-graph ファイルを探す（単一ファイル → チェーン）"""
+    info_dir = os.path.join(repo_path, ".git", "objects", "info")
+    single = os.path.join(info_dir, "commit-graph")
+    if os.path.isfile(single):
+        return [single]
+
+    graphs_dir = os.path.join(info_dir, "commit-graphs")
+    chain = os.path.join(graphs_dir, "commit-graph-chain")
+    if not os.path.isfile(chain):
+        return []
+    with open(chain, encoding="utf-8") as f:
+        hashes = [line.strip() for line in f if line.strip()]
+    paths = [os.path.join(graphs_dir, f"graph-{h}.graph") for h in hashes]
+    if not all(os.path.isfile(p) for p in paths):
+        return []
+    return paths
+
+
+def read_commit_graph(repo_path):
+    """commit-graph を読み込む。ファイルが無い・読めない場合は None"""
+    paths = find_graph_files(repo_path)
+    if not paths:
+        return None
+
+    oids, parents, generations, times = [], [], [], []
+    try:
+        # チェーンはベースから順に並んでおり、親の位置はチェーン全体の通し番号
+        for path in paths:
+            _read_graph_file(path, oids, parents, generations, times)
+    except (OSError, ValueError, struct.error):
+        return None
+    return CommitGraph(oids, parents, generations, times)
+
+
+def _read_graph_file(path, oids, parents, generations, times):
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    # git gc がファイルを差し替えられるよう、読み終えたらすぐに閉じる
+    try:
+        signature, version, hash_version, num_chunks, _ = struct.unpack_from(">4sBBBB", data, 0)
+        if signature != SIGNATURE or version != 1 or hash_version not in HASH_LENGTHS:
+            raise ValueError(f"unsupported commit-graph: {path}")
+        hash_len = HASH_LENGTHS[hash_version]
+
+        chunks = {}
+        for i in range(num_chunks):
+            chunk_id, offset = struct.unpack_from(">4sQ", data, 8 + 12 * i)
+            chunks[chunk_id] = offset
+        for required in (CHUNK_FANOUT, CHUNK_OID_LOOKUP, CHUNK_COMMIT_DATA):
+            if required not in chunks:
+                raise ValueError(f"missing chunk {required!r}: {path}")
+
+        count = struct.unpack_from(">I", data, chunks[CHUNK_FANOUT] + 255 * 4)[0]
+
+        # OID はまとめて16進化してから切り出す
+        oid_start = chunks[CHUNK_OID_LOOKUP]
+        hex_oids = data[oid_start:oid_start + count * hash_len].hex()
+        step = hash_len * 2
+        oids.extend(hex_oids[i:i + step] for i in range(0, len(hex_oids), step))
+
+        edges = chunks.get(CHUNK_EXTRA_EDGES)
+        data_start = chunks[CHUNK_COMMIT_DATA]
+        records = data[data_start:data_start + count * (hash_len + 16)]
+        for parent1, parent2, gen_hi, time_lo in struct.iter_unpack(f">{hash_len}xIIII", records):
+            if parent1 == GRAPH_PARENT_NONE:
+                parents.append(())
+            elif parent2 == GRAPH_PARENT_NONE:
+                parents.append((parent1,))
+            elif parent2 & GRAPH_EXTRA_EDGES_NEEDED:
+                parents.append((parent1, *_read_extra_edges(data, edges, parent2 & ~GRAPH_EXTRA_EDGES_NEEDED)))
+            else:
+                parents.append((parent1, parent2))
+            generations.append(gen_hi >> 2)
+            times.append(((gen_hi & 0x3) << 32) | time_lo)
+    finally:
+        data.close()
+
+
+def _read_extra_edges(data, edges, index):
+    if edges is None:
+        raise ValueError("octopus merge without EDGE chunk")
+    result = []
+    while True:
+        edge = struct.unpack_from(">I", data, edges + 4 * index)[0]
+        result.append(edge & ~GRAPH_LAST_EDGE)
+        if edge & GRAPH_LAST_EDGE:
+            return result
+        index += 1
+
+
+def load_commits_from_graph(repo_path):
+    """commit-graph からコミットと深さを読む
+
+    ref と HEAD から辿れるコミットだけを返す。commit-graph が無い、または先端を
+    含まない古いグラフの場合は load_topology にフォールバックし、深さは None
+    （レイアウト側で計算）を返す。
+    """
+    graph = read_commit_graph(repo_path)
+    positions = graph.reachable(ref_tips(repo_path)) if graph is not None else None
+    if positions is None:
+        return load_topology(repo_path), None
+    return graph.to_commits(positions), graph.depths(positions)
@@ -0,0 +1,78 @@
+import numpy as np
+
+
+class EdgePlan:
+    """親子の辺をまとめ直した結果
+
+    chains: 同じレーンを第一親で辿れるコミットの列（1本のポリラインにする）
+    links: それ以外の辺 (親, 子)。分岐とマージの辺
+    connectors: 幹への接続枝が必要なコミット（レーンの先頭だけ）
+    """
+    def __init__(self, chains, links, connectors):
+        self.chains = chains
+        self.links = links
+        self.connectors = connectors
+
+    def edge_count(self):
+        return len(self.chains) + len(self.links)
+
+
+def plan_edges(parent_indices, lanes):
+    """同じレーン上の連続した辺を1本のポリラインにまとめる
+
+    各コミットについて、第一親が同じレーンにあればその続きとして繋ぐ。
+    続きになったコミットは親経由で既に幹と繋がっているので、
+    幹への接続枝はレーンの先頭のコミットにだけ付ける。
+    """
+    n = len(parent_indices)
+    lanes = lanes.tolist()
+    next_on_lane = [-1] * n
+    has_prev = bytearray(n)
+    links = []
+
+    for i, parents in enumerate(parent_indices):
+        for k, parent in enumerate(parents):
+            if k == 0 and lanes[parent] == lanes[i] and next_on_lane[parent] == -1:
+                next_on_lane[parent] = i
+                has_prev[i] = 1
+            else:
+                links.append((parent, i))
+
+    chains = []
+    for i in range(n):
+        if has_prev[i] or next_on_lane[i] == -1:
+            continue
+        chain = [i]
+        j = next_on_lane[i]
+        while j != -1:
+            chain.append(j)
+            j = next_on_lane[j]
+        chains.append(chain)
+
+    connectors = [i for i in range(n) if lanes[i] != 0 and not has_prev[i]]
+    return EdgePlan(chains, links, connectors)
+
+
+def bundle_links(links, positions, lanes, strength=0.6):
+    """同じレーン間の辺を共通の中継点に寄せて束ねる
+
+    (親のレーン, 子のレーン) ごとに辺の中点の重心を求め、各辺の中点を
+    strength の割合でそこへ寄せた3点のポリラインを返す。
+    """
+    if not links:
+        return []
+    links = np.array(links, dtype=np.int64)
+    starts = positions[links[:, 0]]
+    ends = positions[links[:, 1]]
+    midpoints = (starts + ends) / 2
+
+    # レーンは負や小数（FANOUT）もあるので、(親のレーン, 子のレーン) の組そのものでまとめる
+    pairs = np.column_stack((lanes[links[:, 0]], lanes[links[:, 1]]))
+    _, group, counts = np.unique(pairs, axis=0, return_inverse=True, return_counts=True)
+    group = group.reshape(-1)
+    centroids = np.zeros((len(counts), 3))
+    np.add.at(centroids, group, midpoints)
+    centroids /= counts[:, None]
+
+    controls = midpoints + (centroids[group] - midpoints) * strength
+    return list(np.stack((starts, controls, ends), axis=1))
@@ -0,0 +1,30 @@
+"""Blender に依存しないメッシュのテンプレート（チャンク生成と書き出しで共有）"""
+import numpy as np
+
+
+def sphere_template(radius, segments=8, rings=6):
+    """低ポリの UV 球 (頂点 (V, 3), 三角形 (T, 3))"""
+    theta = np.linspace(0, np.pi, rings + 1)[1:-1]
+    phi = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    ring = np.column_stack((
+        np.outer(np.sin(theta), np.cos(phi)).ravel(),
+        np.outer(np.sin(theta), np.sin(phi)).ravel(),
+        np.repeat(np.cos(theta), segments),
+    ))
+    verts = np.vstack(([0, 0, 1], ring, [0, 0, -1])) * radius
+    top, bottom = 0, len(verts) - 1
+
+    tris = []
+    j = np.arange(segments)
+    nxt = (j + 1) % segments
+    tris.append(np.column_stack((np.full(segments, top), 1 + j, 1 + nxt)))
+    for r in range(rings - 2):
+        a = 1 + r * segments + j
+        b = 1 + r * segments + nxt
+        c = a + segments
+        d = b + segments
+        tris.append(np.column_stack((a, c, d)))
+        tris.append(np.column_stack((a, d, b)))
+    last = 1 + (rings - 2) * segments
+    tris.append(np.column_stack((last + j, np.full(segments, bottom), last + nxt)))
+    return verts.astype(np.float32), np.vstack(tris).astype(np.int32)
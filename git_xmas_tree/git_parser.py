@@ -1,5 +1,6 @@
 import subprocess
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from .git_pool import get_worker
 
 @dataclass
 class Commit:
@@ -9,9 +10,121 @@ class Commit:
     message: str
     branch: str
 
-def load_commits(repo_path):
+
+@dataclass
+class LogFilter:
+    """git log に渡す履歴の絞り込み条件"""
+    since: str = ""
+    until: str = ""
+    include_refs: list[str] = field(default_factory=list)
+    exclude_refs: list[str] = field(default_factory=list)
+    first_parent: bool = False
+    pathspec: list[str] = field(default_factory=list)
+
+    @classmethod
+    def from_text(cls, since="", until="", include_refs="", exclude_refs="", first_parent=False, pathspec=""):
+        """パネルのカンマ区切り文字列から作成"""
+        return cls(
+            since=since.strip(),
+            until=until.strip(),
+            include_refs=split_patterns(include_refs),
+            exclude_refs=split_patterns(exclude_refs),
+            first_parent=first_parent,
+            pathspec=split_patterns(pathspec),
+        )
+
+    def rev_args(self):
+        """リビジョン指定部分の引数（pathspec を除く）"""
+        args = []
+        if self.since:
+            args.append(f"--since={self.since}")
+        if self.until:
+            args.append(f"--until={self.until}")
+        if self.first_parent:
+            args.append("--first-parent")
+        if self.pathspec:
+            # 親を絞り込み後のコミットに書き換えて木を繋げたままにする
+            args.append("--parents")
+
+        return args + self.ref_args()
+
+    def ref_args(self, all_refs=("--all",)):
+        """ref の指定部分の引数（include_refs が無いときは all_refs の全体から除外する）"""
+        # --exclude は直後の --all / --glob などにだけ効くので、それぞれの前に並べる
+        excludes = [f"--exclude={_full_ref_pattern(pattern)}" for pattern in self.exclude_refs]
+        args = []
+        if self.include_refs:
+            for pattern in self.include_refs:
+                # git は * ? [ の無い --glob に /* を補うので、そのままの ref 名は通常のリビジョンとして渡す
+                if _is_glob(pattern):
+                    args += [*excludes, f"--glob={_full_ref_pattern(pattern)}"]
+                else:
+                    args.append(_full_ref_pattern(pattern))
+        else:
+            for option in all_refs:
+                args += [*excludes, option]
+        return args
+
+    def path_args(self):
+        """pathspec 部分の引数"""
+        if not self.pathspec:
+            return []
+        return ["--", *self.pathspec]
+
+
+def split_patterns(text):
+    return [p.strip() for p in text.split(",") if p.strip()]
+
+
+def _is_glob(pattern):
+    return any(ch in pattern for ch in "*?[")
+
+
+def _full_ref_pattern(pattern):
+    # "heads/feature/*" のような短い指定は refs/ 配下として扱う
+    return pattern if pattern.startswith("refs/") else f"refs/{pattern}"
+
+
+def log_command(log_filter=None):
+    """load_commits と同じ出力形式の git log コマンド"""
+    log_filter = log_filter or LogFilter()
+    return [
+        "git", "log", "--reverse", "--pretty=format:%H|%P|%ct|%s|%D",
+        *log_filter.rev_args(),
+        *log_filter.path_args(),
+    ]
+
+
+def parse_log_line(log):
+    """log_command の出力1行を Commit にする"""
+    parts = log.split("|")
+    hash = parts[0]
+    parents = parts[1].split() if parts[1] else []
+    time = int(parts[2])
+    message = parts[3] if len(parts) > 3 else ""
+    branch = parts[4] if len(parts) > 4 else ""
+    return Commit(hash, parents, time, message, branch)
+
+
+def load_commits(repo_path, log_filter=None):
+    logs = subprocess.check_output(
+        log_command(log_filter),
+        cwd=repo_path,
+        encoding='utf-8',
+        text=True,
+    ).splitlines()
+
+    return [parse_log_line(log) for log in logs]
+
+def load_topology(repo_path, log_filter=None):
+    """第1段階: ハッシュ・親・時刻だけを読む。件名と ref 装飾は空のまま"""
+    log_filter = log_filter or LogFilter()
     logs = subprocess.check_output(
-        f'git log --all --reverse --pretty=format:%H|%P|%ct|%s|%D',
+        [
+            "git", "log", "--reverse", "--pretty=format:%H %P %ct",
+            *log_filter.rev_args(),
+            *log_filter.path_args(),
+        ],
         cwd=repo_path,
         encoding='utf-8',
         text=True,
@@ -19,12 +132,70 @@ def load_commits(repo_path):
 
     commits = []
     for log in logs:
-        parts = log.split("|")
-        hash = parts[0]
-        parents = parts[1].split() if parts[1] else []
-        time = int(parts[2])
-        message = parts[3] if len(parts) > 3 else ""
-        branch = parts[4] if len(parts) > 4 else ""
-        commits.append(Commit(hash, parents, time, message, branch))
+        parts = log.split()
+        commits.append(Commit(parts[0], parts[1:-1], int(parts[-1]), "", ""))
 
     return commits
+
+
+def fetch_metadata(repo_path, commits, with_subjects=True):
+    """第2段階: 表示するコミットにだけ ref 装飾と件名を付ける"""
+    fetch_decorations(repo_path, commits)
+    if with_subjects:
+        fetch_subjects(repo_path, commits)
+
+
+def fetch_decorations(repo_path, commits):
+    """ref の先端だけを for-each-ref で引き、%D 相当の装飾を付ける（履歴は辿らない）"""
+    refs = subprocess.check_output(
+        ["git", "for-each-ref", "--format=%(objectname) %(*objectname) %(refname) %(refname:short)"],
+        cwd=repo_path,
+        encoding='utf-8',
+        text=True,
+    ).splitlines()
+
+    decorations = {}
+    for ref in refs:
+        parts = ref.split()
+        # 注釈付きタグは剥がした先のコミットに付ける
+        oid, refname, short = (parts[1], parts[2], parts[3]) if len(parts) == 4 else (parts[0], parts[1], parts[2])
+        name = f"tag: {short}" if refname.startswith("refs/tags/") else short
+        decorations.setdefault(oid, []).append(name)
+
+    for commit in commits:
+        names = decorations.get(commit.hash)
+        if names:
+            commit.branch = ", ".join(names)
+
+
+def fetch_subjects(repo_path, commits):
+    """件名が空のコミットだけ、1回の git log --no-walk --stdin でまとめて取得する"""
+    targets = {c.hash: c for c in commits if not c.message}
+    if not targets:
+        return
+    logs = subprocess.run(
+        ["git", "log", "--no-walk=unsorted", "--stdin", "--pretty=format:%H %s"],
+        cwd=repo_path,
+        input="\n".join(targets),
+        capture_output=True,
+        encoding='utf-8',
+        text=True,
+        check=True,
+    ).stdout.splitlines()
+
+    for log in logs:
+        hash, _, message = log.partition(" ")
+        commit = targets.get(hash)
+        if commit is not None:
+            commit.message = message
+
+
+def fetch_details(repo_path, commit_hash):
+    """1コミット分の作者と件名を取得する（ピックしたコミットの表示用）
+
+    常駐の git cat-file に問い合わせるので、毎回 git を起動しない。
+    """
+    commit = get_worker(repo_path).commit(commit_hash)
+    if commit is None:
+        return "", ""
+    return commit.author, commit.subject
@@ -0,0 +1,128 @@
+"""リポジトリごとに常駐させる git cat-file --batch プロセス
+
+コミットの件名や作者を1件ずつ引くたびに git を起動すると fork/exec の分だけ
+遅くなるので、プロセスを1つ立ち上げたままにしてパイプ越しに問い合わせる。
+アドオンの unregister() で shutdown() を呼んで後始末する。
+"""
+import os
+import subprocess
+import threading
+from dataclasses import dataclass
+
+# 一度に書き込む問い合わせ数（入力がパイプのバッファに収まる量にして詰まりを防ぐ）
+BATCH_SIZE = 64
+
+
+@dataclass
+class CommitObject:
+    hash: str
+    parents: list[str]
+    author: str
+    time: int
+    subject: str
+
+
+class CatFile:
+    """1リポジトリ分の git cat-file --batch"""
+
+    def __init__(self, repo_path):
+        self.repo_path = repo_path
+        self.lock = threading.Lock()
+        self.process = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            cwd=repo_path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def read(self, oid):
+        """(種類, 中身) を返す。オブジェクトが無ければ None"""
+        return self.read_many([oid])[0]
+
+    def read_many(self, oids):
+        results = []
+        with self.lock:
+            for start in range(0, len(oids), BATCH_SIZE):
+                batch = oids[start:start + BATCH_SIZE]
+                self.process.stdin.write("".join(f"{oid}\n" for oid in batch).encode())
+                self.process.stdin.flush()
+                results.extend(self._read_object() for _ in batch)
+        return results
+
+    def commit(self, oid):
+        return self.commits([oid])[0]
+
+    def commits(self, oids):
+        return [
+            parse_commit(oid, body) if kind == "commit" else None
+            for oid, (kind, body) in zip(oids, (r or (None, None) for r in self.read_many(oids)))
+        ]
+
+    def close(self):
+        if self.alive:
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process.stdout.close()
+
+    def _read_object(self):
+        header = self.process.stdout.readline()
+        if not header:
+            raise RuntimeError(f"git cat-file exited: {self.repo_path}")
+        fields = header.split()
+        if len(fields) < 3 or fields[1] == b"missing":
+            return None
+        size = int(fields[2])
+        body = self.process.stdout.read(size)
+        self.process.stdout.read(1)  # 末尾の改行
+        return fields[1].decode(), body
+
+
+def parse_commit(oid, body):
+    """commit オブジェクトの中身から親・作者・コミット時刻・件名を取り出す"""
+    header, _, message = body.decode("utf-8", errors="replace").partition("\n\n")
+    parents = []
+    author = ""
+    time = 0
+    for line in header.splitlines():
+        key, _, value = line.partition(" ")
+        if key == "parent":
+            parents.append(value)
+        elif key == "author":
+            author = value.rpartition(" <")[0]
+        elif key == "committer":
+            # "Name <mail> 1700000000 +0900"
+            time = int(value.rsplit(" ", 2)[-2])
+    subject = " ".join(message.split("\n\n", 1)[0].split())
+    return CommitObject(oid, parents, author, time, subject)
+
+
+_workers = {}
+_workers_lock = threading.Lock()
+
+
+def get_worker(repo_path):
+    """リポジトリの常駐プロセスを返す（無いか終了していれば起動し直す）"""
+    key = os.path.realpath(repo_path)
+    with _workers_lock:
+        worker = _workers.get(key)
+        if worker is None or not worker.alive:
+            if worker is not None:
+                worker.close()
+            worker = CatFile(key)
+            _workers[key] = worker
+        return worker
+
+
+def shutdown():
+    with _workers_lock:
+        for worker in _workers.values():
+            worker.close()
+        _workers.clear()
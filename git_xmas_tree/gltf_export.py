@@ -0,0 +1,189 @@
+"""レイアウトの配列から直接 glTF (.glb) を書き出す（Blender 不要）
+
+球は1つのメッシュを EXT_mesh_gpu_instancing でコミット数だけインスタンス化し、
+色はインスタンスごとの属性 _COLOR_0 で持つ。枝は全ての辺を1つの LINES
+プリミティブにまとめる。ファイルサイズはコミットあたり数十バイトで済む。
+
+    python -m git_xmas_tree.gltf_export REPO --out tree.glb
+"""
+import argparse
+import json
+import struct
+import sys
+import numpy as np
+from .commit_graph import load_commits_from_graph
+from .geometry import sphere_template
+from .stats import history_stats
+from .snapshot import EDGE_COLOR, LAYOUT_NAMES, make_layout, layout_edges, node_colors
+
+SPHERE_RADIUS = 0.18
+INSTANCING = "EXT_mesh_gpu_instancing"
+
+# glTF の定数
+FLOAT = 5126
+UNSIGNED_INT = 5125
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+TRIANGLES = 4
+LINES = 1
+
+
+class GlbWriter:
+    """1つのバイナリバッファに配列を詰めながら glTF の JSON を組み立てる"""
+
+    def __init__(self):
+        self.gltf = {
+            "asset": {"version": "2.0", "generator": "Git Xmas Tree"},
+            "buffers": [],
+            "bufferViews": [],
+            "accessors": [],
+            "materials": [],
+            "meshes": [],
+            "nodes": [],
+            "scenes": [{"nodes": []}],
+            "scene": 0,
+        }
+        self.chunks = []
+        self.length = 0
+
+    def view(self, array, target=None):
+        """array をバッファに書き込み、bufferView のインデックスを返す"""
+        data = np.ascontiguousarray(array).tobytes()
+        view = {"buffer": 0, "byteOffset": self.length, "byteLength": len(data)}
+        if target is not None:
+            view["target"] = target
+        self.gltf["bufferViews"].append(view)
+        self.chunks.append(data)
+        # 各 bufferView は4バイト境界から始める
+        padding = -len(data) % 4
+        self.chunks.append(b"\0" * padding)
+        self.length += len(data) + padding
+        return len(self.gltf["bufferViews"]) - 1
+
+    def accessor(self, array, kind, target=None, bounds=False, view=None):
+        """アクセサのインデックスを返す。view を渡すと書き込み済みの bufferView を共有する"""
+        array = np.ascontiguousarray(array)
+        if view is None:
+            view = self.view(array, target)
+        accessor = {
+            "bufferView": view,
+            "componentType": FLOAT if array.dtype == np.float32 else UNSIGNED_INT,
+            "count": len(array),
+            "type": kind,
+        }
+        if bounds and len(array):
+            accessor["min"] = array.min(axis=0).tolist()
+            accessor["max"] = array.max(axis=0).tolist()
+        self.gltf["accessors"].append(accessor)
+        return len(self.gltf["accessors"]) - 1
+
+    def material(self, name, color, unlit=False):
+        material = {
+            "name": name,
+            "pbrMetallicRoughness": {"baseColorFactor": [*color, 1.0], "metallicFactor": 0.3, "roughnessFactor": 0.4},
+        }
+        if unlit:
+            material["extensions"] = {"KHR_materials_unlit": {}}
+            self._use("KHR_materials_unlit")
+        self.gltf["materials"].append(material)
+        return len(self.gltf["materials"]) - 1
+
+    def node(self, node):
+        self.gltf["nodes"].append(node)
+        self.gltf["scenes"][0]["nodes"].append(len(self.gltf["nodes"]) - 1)
+
+    def write(self, path):
+        self.gltf["buffers"].append({"byteLength": self.length})
+        document = json.dumps(self.gltf, separators=(",", ":")).encode("utf-8")
+        document += b" " * (-len(document) % 4)
+        total = 12 + 8 + len(document) + 8 + self.length
+        with open(path, "wb") as f:
+            f.write(struct.pack("<4sII", b"glTF", 2, total))
+            f.write(struct.pack("<I4s", len(document), b"JSON"))
+            f.write(document)
+            f.write(struct.pack("<I4s", self.length, b"BIN\0"))
+            for chunk in self.chunks:
+                f.write(chunk)
+        return total
+
+    def _use(self, extension):
+        used = self.gltf.setdefault("extensionsUsed", [])
+        if extension not in used:
+            used.append(extension)
+
+
+def export_glb(path, positions, edges, colors, radius=SPHERE_RADIUS):
+    """positions (N, 3), edges (E, 2), colors (N, 3) の 0〜1 から .glb を書き、バイト数を返す"""
+    writer = GlbWriter()
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+
+    # 球（1メッシュ + インスタンスごとの位置と色）
+    verts, tris = sphere_template(radius)
+    normals = verts / np.linalg.norm(verts, axis=1, keepdims=True)
+    sphere = {
+        "name": "Commits",
+        "primitives": [{
+            "attributes": {
+                "POSITION": writer.accessor(verts, "VEC3", ARRAY_BUFFER, bounds=True),
+                "NORMAL": writer.accessor(normals.astype(np.float32), "VEC3", ARRAY_BUFFER),
+            },
+            "indices": writer.accessor(tris.astype(np.uint32).ravel(), "SCALAR", ELEMENT_ARRAY_BUFFER),
+            "material": writer.material("Commit", (1.0, 1.0, 1.0)),
+            "mode": TRIANGLES,
+        }],
+    }
+    writer.gltf["meshes"].append(sphere)
+    # コミット位置はインスタンスの移動量と枝の頂点で共有する
+    position_view = writer.view(positions) if len(positions) else None
+    if len(positions):
+        writer._use(INSTANCING)
+        writer.node({
+            "name": "Commits",
+            "mesh": len(writer.gltf["meshes"]) - 1,
+            "extensions": {INSTANCING: {"attributes": {
+                "TRANSLATION": writer.accessor(positions, "VEC3", view=position_view),
+                "_COLOR_0": writer.accessor(np.asarray(colors, dtype=np.float32).reshape(-1, 3), "VEC3"),
+            }}},
+        })
+
+    # 枝（全ての辺を1つの線プリミティブに）
+    if len(edges):
+        writer.gltf["meshes"].append({
+            "name": "Branches",
+            "primitives": [{
+                "attributes": {"POSITION": writer.accessor(positions, "VEC3", bounds=True, view=position_view)},
+                "indices": writer.accessor(np.asarray(edges, dtype=np.uint32).ravel(), "SCALAR", ELEMENT_ARRAY_BUFFER),
+                "material": writer.material("Branch", [c / 255 for c in EDGE_COLOR], unlit=True),
+                "mode": LINES,
+            }],
+        })
+        writer.node({"name": "Branches", "mesh": len(writer.gltf["meshes"]) - 1})
+
+    return writer.write(path)
+
+
+def export_layout(path, layout, commits, branch_ids=None):
+    """BranchLayout / TreeLayout / EngineLayout をそのまま書き出す（色は node_colors と同じ）"""
+    colors = np.array(node_colors(layout, commits, branch_ids), dtype=np.float32) / 255
+    return export_glb(path, layout.positions_array(), layout_edges(layout, commits), colors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a Git Xmas Tree as an instanced glTF binary")
+    parser.add_argument("repo", help="Repository to export")
+    parser.add_argument("--out", default="tree.glb", help="Output .glb file")
+    parser.add_argument("--layout", choices=LAYOUT_NAMES, default="branch")
+    args = parser.parse_args(argv)
+
+    commits, depths = load_commits_from_graph(args.repo)
+    if not commits:
+        print(f"{args.repo}: no commits", file=sys.stderr)
+        return 1
+    layout = make_layout(commits, depths, args.layout)
+    size = export_layout(args.out, layout, commits, history_stats(args.repo, commits).branch_ids)
+    print(f"{args.repo}: {len(commits)} commits -> {args.out} ({size / 1024:.0f} KiB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
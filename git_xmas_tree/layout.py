@@ -1,5 +1,32 @@
+import hashlib
 import math
-import random
+import numpy as np
+from .layout_engines import (
+    GraphArrays,
+    assign_active_lanes,
+    branch_raw_positions,
+    calculate_depths,
+    commit_arrays,
+    fit_bounds,
+    fit_positions,
+    get_engine,
+    tree_positions,
+)
+from .memory import no_stage
+
+
+def layout_fingerprint(commits, **params):
+    """コミット集合とパラメータから決まるレイアウトのキー（キャッシュ用）
+
+    同じ入力なら同じ座標になるので、レイアウトファイルやレンダリング結果の
+    キャッシュキーにそのまま使える。
+    """
+    digest = hashlib.sha256()
+    for key in sorted(params):
+        digest.update(f"{key}={params[key]!r};".encode())
+    for commit in commits:
+        digest.update(f"{commit.hash} {' '.join(commit.parents)} {commit.time}\n".encode())
+    return digest.hexdigest()
 
 
 class TreeLayout:
@@ -15,8 +42,8 @@ class TreeLayout:
         self.height = height
         self.base_radius = base_radius
         self.radius_power = radius_power
-
-        random.seed(seed)
+        self.seed = seed
+        self._positions = None
         self._normalize_time()
 
     def _normalize_time(self):
@@ -26,20 +53,33 @@ class TreeLayout:
         self.t_range = max(1, self.t_max - self.t_min)
 
     def position(self, commit, index):
-        z_norm = (commit.time - self.t_min) / self.t_range
-        z = z_norm * self.height
+        """positions_array() の index 行目（揺らぎは seed と index で決まり、呼ぶ順に依らない）"""
+        if self._positions is None:
+            self._positions = self.positions_array()
+        return tuple(self._positions[index].tolist())
 
-        r_max = (1.0 - z_norm) ** self.radius_power * self.base_radius
+    def positions_array(self, times=None, hash_prefixes=None):
+        """全コミットの座標を (N, 3) の配列で一度に返す
 
-        h = int(commit.hash[:8], 16)
-        angle = (h % 360) * math.pi / 180.0
+        コミット時刻を高さ、ハッシュを角度にした円錐配置を NumPy でまとめて計算する。
+        揺らぎは seed から作った Generator で付けるので、同じ入力なら同じ結果になる。
+        """
+        if times is None or hash_prefixes is None:
+            times, hash_prefixes = commit_arrays(self.commits)
 
-        r = max(0.0, r_max + random.uniform(-0.15, 0.15))
+        return tree_positions(times, hash_prefixes, self.seed, self.height, self.base_radius, self.radius_power)
 
-        x = r * math.cos(angle)
-        y = r * math.sin(angle)
-
-        return (x, y, z)
+    def fingerprint(self, **extra):
+        # 装飾の seed はレイアウトの seed と同じなので extra 側を優先する
+        params = dict(
+            layout="tree",
+            height=self.height,
+            base_radius=self.base_radius,
+            radius_power=self.radius_power,
+            seed=self.seed,
+        )
+        params.update(extra)
+        return layout_fingerprint(self.commits, **params)
 
 
 class BranchLayout:
@@ -52,69 +92,78 @@ class BranchLayout:
         max_x=5.0,
         max_y=5.0,
         max_z=10.0,
+        depths=None,
+        lane_mode='ACTIVE',
+        stage=no_stage,
     ):
         self.commits = commits
+        self.known_depths = depths
+        self.lane_mode = lane_mode
         self.branch_spacing = branch_spacing
         self.commit_spacing = commit_spacing
         self.max_x = max_x
         self.max_y = max_y
         self.max_z = max_z
-        self._calculate_branch_positions()
-        self._calculate_bounds()
+        self._calculate_branch_positions(stage)
+        with stage("bounds"):
+            self._calculate_bounds()
     
-    def _calculate_branch_positions(self):
-        """各コミットのブランチレーンと深さを計算"""
+    def _calculate_branch_positions(self, stage=no_stage):
+        """各コミットのブランチレーンと深さを計算（stage はメモリ計測の区切り）"""
         self.commit_lanes = {}
-        self.commit_depths = {}
         self.used_lanes = set()
-        
-        # まず深さを計算（親からの距離）
-        commit_map = {c.hash: c for c in self.commits}
-        
-        def calculate_depth(commit_hash, visited=None):
-            if visited is None:
-                visited = set()
-            if commit_hash in self.commit_depths:
-                return self.commit_depths[commit_hash]
-            if commit_hash in visited:
-                return 0
-            if commit_hash not in commit_map:
-                return 0
-                
-            visited.add(commit_hash)
-            commit = commit_map[commit_hash]
-            
-            if not commit.parents:
-                depth = 0
+        with stage("depth"):
+            self.commit_index = {c.hash: i for i, c in enumerate(self.commits)}
+            # 読み込んだ範囲内の親だけをインデックスで持つ
+            self.parent_indices = [
+                [self.commit_index[p] for p in c.parents if p in self.commit_index]
+                for c in self.commits
+            ]
+
+            self._calculate_depths()
+            # 深さ順（親→子の順）のインデックス。安定ソートなので同じ深さは読み込み順
+            self.depth_order = np.argsort(self.depths, kind='stable')
+
+        with stage("lanes"):
+            if self.lane_mode == 'FANOUT':
+                self._assign_fanout_lanes()
             else:
-                parent_depths = [calculate_depth(p, visited.copy()) for p in commit.parents if p in commit_map]
-                depth = max(parent_depths) + 1 if parent_depths else 0
-            
-            self.commit_depths[commit_hash] = depth
-            return depth
-        
-        for commit in self.commits:
-            calculate_depth(commit.hash)
-        
+                self._assign_active_lanes()
+
+    def _calculate_depths(self):
+        """深さ（親からの距離）を計算。commit-graph の世代番号があればそれを使う"""
+        n = len(self.commits)
+        if self.known_depths:
+            self.depths = np.array([self.known_depths.get(c.hash, 0) for c in self.commits], dtype=np.int32)
+        else:
+            self.depths = calculate_depths(self.parent_indices)
+        self.max_depth = int(self.depths.max()) if n else 0
+        self.commit_depths = {c.hash: d for c, d in zip(self.commits, self.depths.tolist())}
+
+    def _assign_active_lanes(self):
+        """アクティブレーン方式でレーンを割り当てる（assign_active_lanes を参照）"""
+        self.lanes, self.lane_count = assign_active_lanes(self.parent_indices, self.depths, self.depth_order)
+        for commit, lane in zip(self.commits, self.lanes.tolist()):
+            self.commit_lanes[commit.hash] = lane
+            self.used_lanes.add(lane)
+
+    def _assign_fanout_lanes(self):
+        """従来方式: 分岐ごとに branch_spacing ずつ左右に広げる（レーンは再利用しない）"""
         # 親→子のマッピングを作成
         parent_to_children = {}
-        for commit in self.commits:
-            for parent_hash in commit.parents:
-                if parent_hash in commit_map:
-                    if parent_hash not in parent_to_children:
-                        parent_to_children[parent_hash] = []
-                    parent_to_children[parent_hash].append(commit.hash)
+        for commit, parents in zip(self.commits, self.parent_indices):
+            for parent in parents:
+                parent_to_children.setdefault(self.commits[parent].hash, []).append(commit.hash)
         
         # ルートコミット（親なし）を中央（X=0）に配置
-        root_commits = [c for c in self.commits if not c.parents or not any(p in commit_map for p in c.parents)]
-        for root in root_commits:
-            self.commit_lanes[root.hash] = 0.0
-            self.used_lanes.add(0.0)
+        for commit, parents in zip(self.commits, self.parent_indices):
+            if not parents:
+                self.commit_lanes[commit.hash] = 0.0
+                self.used_lanes.add(0.0)
         
         # 深さ順にコミットを処理（親→子の順）
-        commits_by_depth = sorted(self.commits, key=lambda c: self.commit_depths.get(c.hash, 0))
-        
-        for commit in commits_by_depth:
+        for i in self.depth_order.tolist():
+            commit = self.commits[i]
             if commit.hash in self.commit_lanes:
                 # すでに配置済み
                 parent_lane = self.commit_lanes[commit.hash]
@@ -140,49 +189,56 @@ class BranchLayout:
                         offset = (i - (num_children - 1) / 2.0) * self.branch_spacing
                         self.commit_lanes[child_hash] = parent_lane + offset
                         self.used_lanes.add(parent_lane + offset)
+
+        # 分岐オフセットは小数になるので、このモードのレーン配列は float
+        self.lanes = np.array([self.commit_lanes[c.hash] for c in self.commits], dtype=np.float64)
+        self.lane_count = len(self.used_lanes)
     
+    def fingerprint(self, **extra):
+        """extra には装飾の seed など、レイアウト以外で出力に効くパラメータを渡す"""
+        return layout_fingerprint(
+            self.commits,
+            **extra,
+            layout="branch",
+            branch_spacing=self.branch_spacing,
+            commit_spacing=self.commit_spacing,
+            max_x=self.max_x,
+            max_y=self.max_y,
+            max_z=self.max_z,
+            lane_mode=self.lane_mode,
+        )
+
     def _calculate_bounds(self):
         """全コミットの座標を仮計算して境界を求める"""
-        temp_positions = []
-        for i, commit in enumerate(self.commits):
-            pos = self._position_raw(commit, i)
-            temp_positions.append(pos)
-        
-        if not temp_positions:
+        if not self.commits:
             self.scale = 1.0
             self.offset_x = 0.0
             self.offset_y = 0.0
             self.offset_z = 0.0
             return
         
-        # 最小・最大を計算
-        xs = [p[0] for p in temp_positions]
-        ys = [p[1] for p in temp_positions]
-        zs = [p[2] for p in temp_positions]
-        
-        min_x, max_x_actual = min(xs), max(xs)
-        min_y, max_y_actual = min(ys), max(ys)
-        min_z, max_z_actual = min(zs), max(zs)
-        
-        # 実際の範囲
-        range_x = max_x_actual - min_x
-        range_y = max_y_actual - min_y
-        range_z = max_z_actual - min_z
-        
-        # スケーリング係数を計算（範囲が0の場合は1.0）
-        scale_x = (self.max_x * 2) / range_x if range_x > 0 else 1.0
-        scale_y = (self.max_y * 2) / range_y if range_y > 0 else 1.0
-        scale_z = self.max_z / range_z if range_z > 0 else 1.0
-        
-        # 最小スケールを使用（アスペクト比を維持）
-        self.scale = min(scale_x, scale_y, scale_z)
-        
-        # オフセット - XY方向は中心化しない（lane=0が原点にあるため）
+        # アスペクト比を維持し、XY方向は中心化しない（lane=0が原点にあるため）
         # Z軸のみ最小値を0にする
+        self.scale, self.offset_z = fit_bounds(self._positions_raw_array(), self.max_x, self.max_y, self.max_z)
         self.offset_x = 0.0
         self.offset_y = 0.0
-        self.offset_z = min_z
-    
+
+    def positions_array(self):
+        """position() と同じ最終座標を、commits の順に (N, 3) の配列で返す"""
+        positions = self._positions_raw_array()
+        positions -= (self.offset_x, self.offset_y, self.offset_z)
+        positions *= self.scale
+        return positions
+
+    def edge_array(self):
+        """親子の辺を (親のインデックス, 子のインデックス) の (E, 2) 配列で返す"""
+        edges = [(p, i) for i, parents in enumerate(self.parent_indices) for p in parents]
+        return np.array(edges, dtype=np.int32).reshape(-1, 2)
+
+    def _positions_raw_array(self):
+        """_position_raw をまとめて計算する"""
+        return branch_raw_positions(self.depths, self.lanes, self.branch_spacing, self.commit_spacing)
+
     def position(self, commit, index):
         """スケーリングと正規化を適用した最終的な3D座標を返す"""
         x, y, z = self._position_raw(commit, index)
@@ -198,7 +254,7 @@ class BranchLayout:
         """スケーリング前の生の座標を返す"""
         # Z軸: 高さ（深さに基づく）- 反転させる
         depth = self.commit_depths.get(commit.hash, index)
-        max_depth = max(self.commit_depths.values()) if self.commit_depths else 1
+        max_depth = self.max_depth
         z = (max_depth - depth) * self.commit_spacing  # 反転: 深いコミットほど下に
         
         # X, Y軸: レーンを中心軸の周りに円形配置（円錐形）
@@ -222,3 +278,63 @@ class BranchLayout:
             y = radius * math.sin(angle)
         
         return (x, y, z)
+
+
+class EngineLayout:
+    """登録されたレイアウトエンジン（layout_engines）の結果を BranchLayout と同じ形で使う
+
+    座標はエンジンの配列を max_x / max_y / max_z に収めたもの。レーンを返さない
+    エンジンでは全コミットをレーン0として扱う（幹への枝は付けない）。
+    """
+    def __init__(
+        self,
+        commits,
+        engine,
+        max_x=5.0,
+        max_y=5.0,
+        max_z=10.0,
+        depths=None,
+        seed=0,
+        stage=no_stage,
+        **options,
+    ):
+        self.commits = commits
+        self.engine = engine
+        self.max_x = max_x
+        self.max_y = max_y
+        self.max_z = max_z
+        self.seed = seed
+        self.options = options
+        with stage("depth"):
+            graph = GraphArrays.from_commits(commits, depths)
+            self.parent_indices = graph.parents()
+        with stage("lanes"):
+            result = get_engine(engine).layout(graph, max_x=max_x, max_y=max_y, max_z=max_z, seed=seed, **options)
+        with stage("bounds"):
+            self._positions = fit_positions(result.positions, max_x, max_y, max_z)
+        self._edges = result.edges
+        self.lanes = result.lanes if result.lanes is not None else np.zeros(len(commits), dtype=np.int32)
+        self.lane_count = int(self.lanes.max()) + 1 if len(commits) else 0
+        self.commit_lanes = {c.hash: lane for c, lane in zip(commits, self.lanes.tolist())}
+
+    def position(self, commit, index):
+        return tuple(self._positions[index].tolist())
+
+    def positions_array(self):
+        return self._positions.copy()
+
+    def edge_array(self):
+        return self._edges
+
+    def fingerprint(self, **extra):
+        # 装飾の seed はレイアウトの seed と同じなので extra 側を優先する
+        params = dict(
+            self.options,
+            layout=self.engine.lower(),
+            max_x=self.max_x,
+            max_y=self.max_y,
+            max_z=self.max_z,
+            seed=self.seed,
+        )
+        params.update(extra)
+        return layout_fingerprint(self.commits, **params)
@@ -0,0 +1,55 @@
+import os
+from .git_parser import load_topology, LogFilter
+from .commit_graph import load_commits_from_graph
+from .stats import load_topology_with_stats
+
+
+def validate_repo(repo_path):
+    """リポジトリパスを検証し、問題があればエラーメッセージを返す"""
+    if not repo_path:
+        return "Path is empty"
+    if not os.path.isdir(repo_path):
+        return "Path does not exist"
+    if not os.path.isdir(os.path.join(repo_path, '.git')):
+        return ".git folder not found in the repository"
+    return None
+
+
+def find_repos(root):
+    """root 直下の git リポジトリを列挙する"""
+    return sorted(
+        os.path.join(root, name)
+        for name in os.listdir(root)
+        if os.path.isdir(os.path.join(root, name, ".git"))
+    )
+
+
+def scene_log_filter(scene):
+    """パネルの絞り込み設定から LogFilter を作る"""
+    return LogFilter.from_text(
+        since=scene.tree_since,
+        until=scene.tree_until,
+        include_refs=scene.tree_include_refs,
+        exclude_refs=scene.tree_exclude_refs,
+        first_parent=scene.tree_first_parent,
+        pathspec=scene.tree_pathspec,
+    )
+
+
+def load_scene_commits(scene, log_filter=None):
+    """パネルの設定（または log_filter）に従ってトポロジだけを読み込み (commits, depths) を返す"""
+    log_filter = log_filter or scene_log_filter(scene)
+    if scene.tree_use_commit_graph and log_filter == LogFilter():
+        # 絞り込みが無いときだけ commit-graph からトポロジを直接読む
+        return load_commits_from_graph(scene.repo_path)
+    return load_topology(scene.repo_path, log_filter), None
+
+
+def load_scene_history(scene, log_filter=None):
+    """load_scene_commits に加えて、活動の統計が有効なら HistoryStats も返す"""
+    log_filter = log_filter or scene_log_filter(scene)
+    if not scene.tree_activity:
+        return (*load_scene_commits(scene, log_filter), None)
+    # 作者や週の集計はトポロジと同じ git log の1回で行う（commit-graph は使わない）
+    commits, stats = load_topology_with_stats(scene.repo_path, log_filter)
+    return commits, None, stats
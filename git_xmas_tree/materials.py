@@ -1,3 +1,4 @@
+import zlib
 import bpy
 
 
@@ -117,20 +118,44 @@ def create_commit_material(branch_name=""):
     
     bsdf = nodes.new(type='ShaderNodeBsdfPrincipled')
     
-    # ブランチ名のハッシュから色を生成
-    if branch_name:
-        hash_val = hash(branch_name)
-        r = ((hash_val & 0xFF) / 255.0) * 0.6 + 0.3
-        g = (((hash_val >> 8) & 0xFF) / 255.0) * 0.6 + 0.3
-        b = (((hash_val >> 16) & 0xFF) / 255.0) * 0.6 + 0.3
-    else:
-        r, g, b = 0.5, 0.5, 0.5
+    bsdf.inputs['Base Color'].default_value = (*branch_color(branch_name), 1.0)
+    bsdf.inputs['Metallic'].default_value = 0.3
+    bsdf.inputs['Roughness'].default_value = 0.4
+    
+    output = nodes.new(type='ShaderNodeOutputMaterial')
+    mat.node_tree.links.new(bsdf.outputs['BSDF'], output.inputs['Surface'])
+    
+    return mat
+
+
+def branch_color(branch_name=""):
+    """ブランチ名から決まる色 (r, g, b)"""
+    # ブランチ名のハッシュから色を生成（hash() は実行ごとに変わるので crc32 を使う）
+    if not branch_name:
+        return 0.5, 0.5, 0.5
+    hash_val = zlib.crc32(branch_name.encode('utf-8'))
+    r = ((hash_val & 0xFF) / 255.0) * 0.6 + 0.3
+    g = (((hash_val >> 8) & 0xFF) / 255.0) * 0.6 + 0.3
+    b = (((hash_val >> 16) & 0xFF) / 255.0) * 0.6 + 0.3
+    return r, g, b
+
+
+def create_attribute_commit_material(attribute_name):
+    """コミット用のマテリアル（色はメッシュのカラー属性から読む）"""
+    mat = bpy.data.materials.new(name="CommitMaterial_Attribute")
+    mat.use_nodes = True
+    nodes = mat.node_tree.nodes
+    nodes.clear()
     
-    bsdf.inputs['Base Color'].default_value = (r, g, b, 1.0)
+    attribute = nodes.new(type='ShaderNodeAttribute')
+    attribute.attribute_name = attribute_name
+    
+    bsdf = nodes.new(type='ShaderNodeBsdfPrincipled')
     bsdf.inputs['Metallic'].default_value = 0.3
     bsdf.inputs['Roughness'].default_value = 0.4
     
     output = nodes.new(type='ShaderNodeOutputMaterial')
+    mat.node_tree.links.new(attribute.outputs['Color'], bsdf.inputs['Base Color'])
     mat.node_tree.links.new(bsdf.outputs['BSDF'], output.inputs['Surface'])
     
     return mat
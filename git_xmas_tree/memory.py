@@ -0,0 +1,96 @@
+"""段階ごとのメモリ使用量の記録（tracemalloc のピークと bpy.data の増減）"""
+import contextlib
+import json
+import time
+import tracemalloc
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+STAGES = ("parse", "depth", "lanes", "bounds", "build")
+DATABLOCKS = ("objects", "meshes", "curves", "materials")
+
+
+def no_stage(name):
+    """計測しないときの stage の代わり"""
+    return contextlib.nullcontext()
+
+
+def datablock_counts():
+    if bpy is None:
+        return {}
+    return {kind: len(getattr(bpy.data, kind)) for kind in DATABLOCKS}
+
+
+class MemoryReport:
+    """with で囲んだ間だけ tracemalloc を動かし、stage() ごとに記録する"""
+
+    def __init__(self):
+        self.stages = []
+        self.commits = 0
+        self._started = False
+        self._baseline = 0
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        self._baseline = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc):
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+        return False
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        blocks = datablock_counts()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            after = datablock_counts()
+            self.stages.append({
+                "stage": name,
+                "seconds": time.perf_counter() - start,
+                "peak_bytes": peak - before,
+                "retained_bytes": current - before,
+                # 実行開始時点からの絶対ピーク（段階をまたいだ保持分を含む）
+                "total_peak_bytes": peak - self._baseline,
+                "datablocks": {kind: after[kind] - blocks[kind] for kind in after},
+            })
+
+    def peak_bytes(self):
+        return max((s["total_peak_bytes"] for s in self.stages), default=0)
+
+    def bytes_per_commit(self):
+        return self.peak_bytes() / self.commits if self.commits else 0.0
+
+    def to_dict(self):
+        return {
+            "commits": self.commits,
+            "peak_bytes": self.peak_bytes(),
+            "bytes_per_commit": self.bytes_per_commit(),
+            "stages": self.stages,
+        }
+
+    def write_json(self, path, **extra):
+        data = dict(extra, **self.to_dict())
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        return data
+
+    def summary(self):
+        """パネル表示用（ID プロパティの int は 32bit なので MB の float にする）"""
+        return {
+            "stages": {s["stage"]: s["peak_bytes"] / 2**20 for s in self.stages},
+            "peak_mb": self.peak_bytes() / 2**20,
+            "bytes_per_commit": self.bytes_per_commit(),
+        }
@@ -0,0 +1,171 @@
+"""弱連結成分ごとに深さとレーンを別プロセスで計算する BranchLayout
+
+ルートコミットが複数ある履歴や、互いに繋がらない長寿命ブランチは独立した
+部分グラフに分かれる。成分ごとに BranchLayout と同じ計算をプロセスプールで行い、
+結果は共有メモリの配列に直接書き込ませる。最後にレーンを成分ごとにずらして繋ぐ。
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from .layout import BranchLayout, EngineLayout, calculate_depths, assign_active_lanes
+from .memory import no_stage
+
+# これより小さい履歴はプロセス起動の方が高くつくので1スレッドで計算する
+PARALLEL_MIN_COMMITS = 50000
+# ワーカー1つあたりのタスク数（成分の大きさの偏りをならす）
+TASKS_PER_WORKER = 4
+
+
+def make_branch_layout(commits, workers=0, engine='BRANCH', seed=0, **options):
+    """workers が2以上なら並列版、それ以外は通常の BranchLayout を返す
+
+    engine に BRANCH 以外を渡すと、layout_engines に登録されたエンジンを EngineLayout で包んで返す。
+    """
+    if engine != 'BRANCH':
+        options.pop("lane_mode", None)
+        return EngineLayout(commits, engine, seed=seed, **options)
+    if workers > 1 and options.get("lane_mode", 'ACTIVE') == 'ACTIVE' and len(commits) >= PARALLEL_MIN_COMMITS:
+        return ParallelBranchLayout(commits, workers=workers, **options)
+    return BranchLayout(commits, **options)
+
+
+def weak_components(edges, n):
+    """(E, 2) の辺から弱連結成分のラベル（成分内の最小インデックス）を求める"""
+    labels = np.arange(n, dtype=np.int64)
+    if len(edges) == 0:
+        return labels
+    a, b = edges[:, 0], edges[:, 1]
+    while True:
+        # 辺の両端を小さい方のラベルに揃え、ポインタジャンプで縮める
+        low = np.minimum(labels[a], labels[b])
+        updated = labels.copy()
+        np.minimum.at(updated, a, low)
+        np.minimum.at(updated, b, low)
+        updated = updated[updated]
+        while True:
+            jumped = updated[updated]
+            if np.array_equal(jumped, updated):
+                break
+            updated = jumped
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+class ParallelBranchLayout(BranchLayout):
+    """深さとレーンを成分ごとに並列に計算する（ACTIVE レーンのみ）"""
+
+    def __init__(self, commits, workers=2, **options):
+        self.workers = workers
+        super().__init__(commits, **options)
+
+    def fingerprint(self, **extra):
+        # 成分ごとにレーンをずらすので、1プロセスで計算した場合とは座標が異なる
+        return super().fingerprint(**extra, layout_components=True)
+
+    def _calculate_branch_positions(self, stage=no_stage):
+        self.commit_lanes = {}
+        self.used_lanes = set()
+        n = len(self.commits)
+        with stage("depth"):
+            self.commit_index = {c.hash: i for i, c in enumerate(self.commits)}
+            self.parent_indices = [
+                [self.commit_index[p] for p in c.parents if p in self.commit_index]
+                for c in self.commits
+            ]
+            components = self._components()
+
+        with stage("lanes"):
+            depths, lanes = self._layout_components(components)
+
+        self.depths = depths
+        self.max_depth = int(depths.max()) if n else 0
+        self.commit_depths = {c.hash: d for c, d in zip(self.commits, depths.tolist())}
+        self.depth_order = np.argsort(self.depths, kind='stable')
+        self.lanes = lanes
+        self.lane_count = int(lanes.max()) + 1 if n else 0
+        for commit, lane in zip(self.commits, lanes.tolist()):
+            self.commit_lanes[commit.hash] = lane
+            self.used_lanes.add(lane)
+
+    def _components(self):
+        """成分ごとのインデックス配列（大きい順）"""
+        labels = weak_components(self.edge_array(), len(self.commits))
+        order = np.argsort(labels, kind='stable')
+        _, starts = np.unique(labels[order], return_index=True)
+        components = np.split(order, starts[1:])
+        components.sort(key=len, reverse=True)
+        return components
+
+    def _layout_components(self, components):
+        n = len(self.commits)
+        depth_shm = shared_memory.SharedMemory(create=True, size=max(n, 1) * 4)
+        lane_shm = shared_memory.SharedMemory(create=True, size=max(n, 1) * 4)
+        try:
+            tasks = self._make_tasks(components)
+            lane_counts = [0] * len(components)
+            # Blender の中から fork しないよう spawn で起動する
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+                futures = [
+                    pool.submit(_layout_task, depth_shm.name, lane_shm.name, n, task)
+                    for task in tasks
+                ]
+                for task, future in zip(tasks, futures):
+                    for (k, _, _, _), count in zip(task, future.result()):
+                        lane_counts[k] = count
+
+            depths = np.ndarray(n, dtype=np.int32, buffer=depth_shm.buf).copy()
+            lanes = np.ndarray(n, dtype=np.int32, buffer=lane_shm.buf).copy()
+        finally:
+            depth_shm.close()
+            depth_shm.unlink()
+            lane_shm.close()
+            lane_shm.unlink()
+
+        # 成分ごとのレーンを重ならないようにずらす（最大の成分がレーン0=幹を使う）
+        offsets = np.cumsum([0] + lane_counts[:-1])
+        for component, offset in zip(components, offsets.tolist()):
+            if offset:
+                lanes[component] += offset
+        return depths, lanes
+
+    def _make_tasks(self, components):
+        """成分をタスクに振り分ける（大きい成分から、最も軽いタスクへ）"""
+        count = min(len(components), self.workers * TASKS_PER_WORKER)
+        tasks = [[] for _ in range(count)]
+        loads = [0] * count
+        for k, component in enumerate(components):
+            t = loads.index(min(loads))
+            local = {int(i): j for j, i in enumerate(component.tolist())}
+            parents = [[local[p] for p in self.parent_indices[i]] for i in component.tolist()]
+            known = None
+            if self.known_depths:
+                known = [self.known_depths.get(self.commits[i].hash, 0) for i in component.tolist()]
+            tasks[t].append((k, component.astype(np.int64), parents, known))
+            loads[t] += len(component)
+        return [task for task in tasks if task]
+
+
+def _layout_task(depth_name, lane_name, n, task):
+    """ワーカー側: 成分ごとに深さとレーンを計算し、共有メモリに書き込む"""
+    depth_shm = shared_memory.SharedMemory(name=depth_name)
+    lane_shm = shared_memory.SharedMemory(name=lane_name)
+    try:
+        depths_out = np.ndarray(n, dtype=np.int32, buffer=depth_shm.buf)
+        lanes_out = np.ndarray(n, dtype=np.int32, buffer=lane_shm.buf)
+        counts = []
+        for _, indices, parents, known in task:
+            if known is not None:
+                depths = np.asarray(known, dtype=np.int32)
+            else:
+                depths = calculate_depths(parents)
+            lanes, lane_count = assign_active_lanes(parents, depths, np.argsort(depths, kind='stable'))
+            depths_out[indices] = depths
+            lanes_out[indices] = lanes
+            counts.append(lane_count)
+        return counts
+    finally:
+        depth_shm.close()
+        lane_shm.close()
@@ -0,0 +1,141 @@
+import blf
+import bpy
+from bpy_extras import view3d_utils
+from mathutils import Vector, kdtree
+from .git_parser import fetch_details
+
+
+class CommitIndex:
+    """レイアウト座標から作るコミットの KD-tree（最近傍 O(log n)）"""
+    def __init__(self, commits, positions):
+        self.commits = [c for c in commits if c.hash in positions]
+        self.tree = kdtree.KDTree(len(self.commits))
+        for i, commit in enumerate(self.commits):
+            self.tree.insert(positions[commit.hash], i)
+        self.tree.balance()
+        # レイの探索範囲を絞るための外接球
+        points = [Vector(positions[c.hash]) for c in self.commits]
+        self.center = sum(points, Vector()) / len(points) if points else Vector()
+        self.radius = max(((p - self.center).length for p in points), default=0.0)
+        # ピックしたコミットの (作者, 件名)
+        self.details = {}
+
+    def nearest(self, co):
+        """co に最も近いコミットと距離"""
+        _, index, distance = self.tree.find(co)
+        if index is None:
+            return None, None
+        return self.commits[index], distance
+
+    def near(self, co, radius):
+        """co から radius 以内のコミット（近い順）"""
+        return [(self.commits[index], distance) for _, index, distance in self.tree.find_range(co, radius)]
+
+    def pick_ray(self, origin, direction, radius):
+        """視線レイから radius 以内で最も手前のコミットを探す
+
+        外接球の中だけ、レイに沿って radius 間隔で find_range を引く。
+        調べるのはレイの周りの筒だけなのでオブジェクト数に依らない。
+        """
+        direction = direction.normalized()
+        center_along = (self.center - origin).dot(direction)
+        start = max(0.0, center_along - self.radius - radius)
+        end = center_along + self.radius + radius
+        along = start
+        while along <= end:
+            best, best_off = None, None
+            for co, index, _ in self.tree.find_range(origin + direction * along, radius * 2):
+                co_along = (co - origin).dot(direction)
+                off_ray = (co - (origin + direction * co_along)).length
+                if off_ray <= radius and (best_off is None or off_ray < best_off):
+                    best, best_off = self.commits[index], off_ray
+            if best is not None:
+                # 手前から調べているので最初に見つかったものを返す
+                return best
+            along += radius
+        return None
+
+
+# 最後に生成したツリーの索引（セッション中のみ保持）
+_index = None
+
+
+def set_index(commits, positions):
+    global _index
+    _index = CommitIndex(commits, positions)
+    return _index
+
+
+def get_index():
+    return _index
+
+
+class GITXMASS_OT_pick(bpy.types.Operator):
+    """カーソル下のコミットの情報をビューポートに表示する"""
+    bl_idname = "gitxmas.pick"
+    bl_label = "Pick Commit"
+
+    pick_radius: bpy.props.FloatProperty(name="Pick Radius", default=0.25, min=0.01)
+
+    def invoke(self, context, event):
+        if context.area.type != 'VIEW_3D':
+            self.report({'ERROR'}, "Run from the 3D Viewport")
+            return {'CANCELLED'}
+        if _index is None:
+            self.report({'ERROR'}, "Generate a tree first")
+            return {'CANCELLED'}
+
+        self.commit = None
+        self.mouse = (event.mouse_region_x, event.mouse_region_y)
+        self._handle = bpy.types.SpaceView3D.draw_handler_add(
+            _draw_overlay, (self, context), 'WINDOW', 'POST_PIXEL'
+        )
+        context.window_manager.modal_handler_add(self)
+        context.area.header_text_set("Pick Commit: move to inspect, click for author, Esc/Right click to exit")
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        context.area.tag_redraw()
+
+        if event.type == 'MOUSEMOVE':
+            self.mouse = (event.mouse_region_x, event.mouse_region_y)
+            region = context.region
+            rv3d = context.region_data
+            origin = view3d_utils.region_2d_to_origin_3d(region, rv3d, self.mouse)
+            direction = view3d_utils.region_2d_to_vector_3d(region, rv3d, self.mouse)
+            self.commit = _index.pick_ray(origin, direction, self.pick_radius)
+            return {'RUNNING_MODAL'}
+
+        if event.type == 'LEFTMOUSE' and event.value == 'PRESS':
+            # 作者は表示対象になったコミットだけ後から取る
+            if self.commit is not None and self.commit.hash not in _index.details:
+                _index.details[self.commit.hash] = fetch_details(context.scene.repo_path, self.commit.hash)
+            return {'RUNNING_MODAL'}
+
+        if event.type in {'ESC', 'RIGHTMOUSE'}:
+            bpy.types.SpaceView3D.draw_handler_remove(self._handle, 'WINDOW')
+            context.area.header_text_set(None)
+            context.area.tag_redraw()
+            return {'CANCELLED'}
+
+        return {'PASS_THROUGH'}
+
+
+def _draw_overlay(op, context):
+    commit = op.commit
+    if commit is None:
+        return
+    author, subject = _index.details.get(commit.hash, ("(click to load)", ""))
+    lines = [
+        f"Hash: {commit.hash[:10]}",
+        f"Author: {author}",
+        f"Message: {commit.message or subject}",
+        f"Branch: {commit.branch or '-'}",
+    ]
+    font_id = 0
+    blf.size(font_id, 14)
+    blf.color(font_id, 1.0, 1.0, 1.0, 1.0)
+    x, y = op.mouse
+    for i, line in enumerate(lines):
+        blf.position(font_id, x + 16, y - 16 - i * 18, 0)
+        blf.draw(font_id, line)
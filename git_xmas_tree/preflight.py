@@ -0,0 +1,129 @@
+import subprocess
+from dataclasses import dataclass, replace
+
+# 1要素あたりのおおよそのコスト（目安）
+SPHERE_VERTICES = 482  # primitive_uv_sphere_add の既定 (32 x 16)
+CURVE_VERTICES_PER_POINT = 16  # bevel_resolution=3 の断面
+OPS_OBJECT_SECONDS = 0.004  # bpy.ops でのプリミティブ追加（シーン更新込み）
+DATA_OBJECT_SECONDS = 0.0008  # bpy.data でのカーブオブジェクト作成
+MATERIAL_SECONDS = 0.0005
+DECORATION_OBJECTS = 30 + 20 + 3  # オーナメント・ライト・幹と星
+DECORATION_MATERIALS = 6 + 4
+CHUNK_SPHERE_VERTICES = 42  # sphere_template の既定 (8 x 6)
+SPLINE_SECONDS = 0.00004  # チャンクのカーブに1本のスプラインを足す
+CHUNK_VERTEX_SECONDS = 0.00000005  # foreach_set での頂点の書き込み
+
+
+@dataclass
+class Estimate:
+    commits: int
+    branch_tips: int
+    objects: int
+    materials: int
+    vertices: int
+    seconds: float
+
+    def exceeds(self, max_objects, max_seconds):
+        return self.objects > max_objects or self.seconds > max_seconds
+
+
+def count_commits(repo_path, log_filter):
+    """git rev-list --count で読み込まれるコミット数だけを数える"""
+    output = subprocess.check_output(
+        ["git", "rev-list", "--count", *log_filter.rev_args(), *log_filter.path_args()],
+        cwd=repo_path,
+        encoding='utf-8',
+        text=True,
+    )
+    return int(output.strip() or 0)
+
+
+def count_branch_tips(repo_path, log_filter):
+    """読み込む ref の先端のコミット数（絞り込みが無ければローカルとリモートのブランチ）"""
+    output = subprocess.check_output(
+        # --exclude は refs/ から書くので、--branches ではなく --glob で範囲を指定する
+        ["git", "rev-parse", *log_filter.ref_args(all_refs=("--glob=refs/heads", "--glob=refs/remotes"))],
+        cwd=repo_path,
+        encoding='utf-8',
+        text=True,
+    )
+    return len(set(output.split()))
+
+
+def estimate_build(commits, branch_tips, simplify_edges=False, chunked=False, chunk_size=5000, layout_engine='BRANCH'):
+    """build_tree / build_tree_chunked が作るオブジェクト数・頂点数・時間を見積もる
+
+    マージ以外の辺はコミット数とほぼ同じ、分岐とマージの辺はブランチの
+    先端数に比例するとして概算する。幹への接続枝はレーンを返すエンジン
+    （BRANCH）だけに付く。
+    """
+    cross_lane_edges = 2 * branch_tips
+    has_lanes = layout_engine == 'BRANCH'
+    if chunked:
+        return _estimate_chunked(commits, branch_tips, cross_lane_edges, chunk_size, has_lanes)
+    if simplify_edges:
+        # レーンごとに1本のポリライン + 分岐とマージの辺、接続枝はレーンの先頭だけ
+        edge_objects = branch_tips + cross_lane_edges
+        connectors = branch_tips if has_lanes else 0
+    else:
+        edge_objects = commits + cross_lane_edges
+        # レーン0以外の全コミット（おおよそ半分とみなす）
+        connectors = commits // 2 if has_lanes else 0
+    curve_objects = edge_objects + connectors
+    curve_points = 2 * (commits + cross_lane_edges + connectors)
+
+    objects = commits + curve_objects + DECORATION_OBJECTS
+    # 球ごとにコミット用マテリアルを1つ作る
+    materials = commits + DECORATION_MATERIALS
+    vertices = commits * SPHERE_VERTICES + curve_points * CURVE_VERTICES_PER_POINT
+    seconds = (
+        commits * OPS_OBJECT_SECONDS
+        + curve_objects * DATA_OBJECT_SECONDS
+        + materials * MATERIAL_SECONDS
+    )
+    return Estimate(commits, branch_tips, objects, materials, vertices, seconds)
+
+
+def _estimate_chunked(commits, branch_tips, cross_lane_edges, chunk_size, has_lanes):
+    """チャンクごとに球の1メッシュと枝の1カーブを作る build_tree_chunked の見積もり
+
+    辺の簡略化は使わず、辺と接続枝はすべてカーブの中のスプラインになる。
+    """
+    chunks = (commits + chunk_size - 1) // max(1, chunk_size)
+    connectors = commits // 2 if has_lanes else 0
+    splines = commits + cross_lane_edges + connectors
+    vertices = commits * CHUNK_SPHERE_VERTICES + 2 * splines * CURVE_VERTICES_PER_POINT
+
+    objects = 2 * chunks + DECORATION_OBJECTS
+    # 枝と、頂点カラーで色を付けるコミット用のマテリアルを1つずつ
+    materials = 2 + DECORATION_MATERIALS
+    seconds = (
+        2 * chunks * DATA_OBJECT_SECONDS
+        + splines * SPLINE_SECONDS
+        + commits * CHUNK_SPHERE_VERTICES * CHUNK_VERTEX_SECONDS
+        + DECORATION_OBJECTS * OPS_OBJECT_SECONDS
+        + materials * MATERIAL_SECONDS
+    )
+    return Estimate(commits, branch_tips, objects, materials, vertices, seconds)
+
+
+def preflight(repo_path, log_filter, **options):
+    """履歴を読まずに数だけ数えて見積もる（options は estimate_build へ渡す）"""
+    return estimate_build(count_commits(repo_path, log_filter), count_branch_tips(repo_path, log_filter), **options)
+
+
+def recommend_mode(repo_path, log_filter, estimate, max_objects, max_seconds, **options):
+    """見積もりが上限を超えるときのおすすめのモード
+
+    'FULL': そのまま生成
+    'DECIMATED': 第一親のみ + 辺の簡略化で収まる場合
+    'PREVIEW': それでも収まらない場合はオブジェクトを作らないプレビュー
+    """
+    if not estimate.exceeds(max_objects, max_seconds):
+        return 'FULL', estimate
+
+    decimated_filter = replace(log_filter, first_parent=True)
+    decimated = estimate_build(count_commits(repo_path, decimated_filter), estimate.branch_tips, **dict(options, simplify_edges=True))
+    if not decimated.exceeds(max_objects, max_seconds):
+        return 'DECIMATED', decimated
+    return 'PREVIEW', decimated
@@ -0,0 +1,80 @@
+import bpy
+import gpu
+import numpy as np
+from gpu_extras.batch import batch_for_shader
+
+# レーンごとの点の色（ループして使う）
+LANE_COLORS = np.array([
+    (1.0, 0.85, 0.2, 1.0),
+    (0.9, 0.2, 0.2, 1.0),
+    (0.3, 0.5, 1.0, 1.0),
+    (0.8, 0.8, 0.9, 1.0),
+    (0.7, 0.3, 0.8, 1.0),
+    (0.2, 0.8, 0.3, 1.0),
+], dtype=np.float32)
+EDGE_COLOR = (0.2, 0.6, 0.25, 0.6)
+
+# プレビューの状態（セッション中のみ保持）
+_preview = {
+    "handle": None,
+    "commits": None,
+    "depths": None,
+}
+
+
+def show_preview(commits, depths, layout):
+    """オブジェクトを作らず、点と線だけでツリーをビューポートに描く"""
+    clear_preview()
+
+    positions = layout.positions_array().astype(np.float32)
+    edges = layout.edge_array()
+    colors = LANE_COLORS[np.abs(layout.lanes).astype(np.int64) % len(LANE_COLORS)]
+
+    point_shader = gpu.shader.from_builtin('POINT_FLAT_COLOR')
+    point_batch = batch_for_shader(point_shader, 'POINTS', {"pos": positions, "color": colors})
+    line_shader = gpu.shader.from_builtin('UNIFORM_COLOR')
+    line_batch = batch_for_shader(line_shader, 'LINES', {"pos": positions}, indices=edges)
+
+    def draw():
+        gpu.state.blend_set('ALPHA')
+        gpu.state.depth_test_set('LESS_EQUAL')
+        line_shader.uniform_float("color", EDGE_COLOR)
+        line_batch.draw(line_shader)
+        gpu.state.point_size_set(4.0)
+        point_batch.draw(point_shader)
+        gpu.state.point_size_set(1.0)
+        gpu.state.depth_test_set('NONE')
+        gpu.state.blend_set('NONE')
+
+    _preview["handle"] = bpy.types.SpaceView3D.draw_handler_add(draw, (), 'WINDOW', 'POST_VIEW')
+    _preview["commits"] = commits
+    _preview["depths"] = depths
+    _redraw()
+
+
+def clear_preview():
+    if _preview["handle"] is not None:
+        bpy.types.SpaceView3D.draw_handler_remove(_preview["handle"], 'WINDOW')
+    _preview["handle"] = None
+    _preview["commits"] = None
+    _preview["depths"] = None
+    _redraw()
+
+
+def has_preview():
+    return _preview["handle"] is not None
+
+
+def preview_commits():
+    """プレビュー中のコミットと深さ（実体化に使う）"""
+    return _preview["commits"], _preview["depths"]
+
+
+def _redraw():
+    window_manager = bpy.context.window_manager
+    if window_manager is None:
+        return
+    for window in window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
@@ -0,0 +1,214 @@
+"""ツリーを1度だけ生成し、複数の Blender をバックグラウンドで並べてレンダリングする
+
+    python -m git_xmas_tree.render_farm REPO --blender blender --workers 4 --frames 1-250 --out renders
+
+1. blender --background でアドオンを登録してツリーを生成し、.blend に保存する
+2. フレーム範囲を重ならないように分け、ワーカーごとに blender -b FILE -s -e -a を起動する
+3. 連番画像が揃っているか確かめ、ffmpeg があれば動画にまとめる
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+
+FRAME_PATTERN = "frame_####"
+
+
+@dataclass
+class Shard:
+    worker: int
+    start: int
+    end: int
+    seconds: float = 0.0
+    returncode: int = 0
+
+    @property
+    def frames(self):
+        return self.end - self.start + 1
+
+    @property
+    def fps(self):
+        return self.frames / self.seconds if self.seconds > 0 else 0.0
+
+
+def split_frames(start, end, workers):
+    """[start, end] を連続した範囲に分ける（空の範囲は作らない）"""
+    total = end - start + 1
+    workers = max(1, min(workers, total))
+    size, extra = divmod(total, workers)
+    shards = []
+    first = start
+    for i in range(workers):
+        count = size + (1 if i < extra else 0)
+        shards.append(Shard(i, first, first + count - 1))
+        first += count
+    return shards
+
+
+def generate_blend(blender, repo, blend_path, settings):
+    """Blender をバックグラウンドで起動し、ツリーを生成して保存する"""
+    addon_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    package = __package__ or "git_xmas_tree"
+    expr = (
+        "import sys; sys.path.insert(0, {path!r}); "
+        "from {package}.render_farm import blender_generate; blender_generate()"
+    ).format(path=addon_parent, package=package)
+    args = dict(settings, repo=os.path.abspath(repo), blend=os.path.abspath(blend_path))
+    subprocess.run(
+        # 例外で終わったときも 0 以外で終了させ、check=True で拾えるようにする
+        [blender, "--background", "--factory-startup", "--python-exit-code", "1", "--python-expr", expr, "--", json.dumps(args)],
+        check=True,
+    )
+
+
+def blender_generate():
+    """Blender の中で実行される側（generate_blend から呼ばれる）"""
+    import bpy
+    from . import register
+
+    args = json.loads(sys.argv[sys.argv.index("--") + 1])
+    register()
+    scene = bpy.context.scene
+    # 初期シーンの立方体は要らない
+    cube = bpy.data.objects.get("Cube")
+    if cube is not None:
+        bpy.data.objects.remove(cube)
+
+    scene.repo_path = args["repo"]
+    scene.tree_seed = args["seed"]
+    scene.tree_timeline = args["timeline"]
+    scene.tree_preflight = False
+    scene.frame_start = args["frame_start"]
+    scene.frame_end = args["frame_end"]
+    scene.render.engine = args["engine"]
+    scene.render.resolution_x, scene.render.resolution_y = args["resolution"]
+    scene.render.image_settings.file_format = 'PNG'
+    result = bpy.ops.gitxmas.generate(mode='FULL')
+    if result != {'FINISHED'}:
+        # リポジトリが無い・履歴が空などで生成できなかったときは空のシーンを保存しない
+        print(f"tree generation failed: {result}", file=sys.stderr)
+        sys.exit(1)
+
+    # ツリー全体が収まるようにカメラを正面に置く
+    camera = scene.camera
+    if camera is not None:
+        size = max(scene.tree_max_z, scene.tree_max_x * 2)
+        camera.location = (0.0, -2.5 * size, scene.tree_max_z / 2)
+        camera.rotation_euler = (math.pi / 2, 0.0, 0.0)
+    bpy.ops.wm.save_as_mainfile(filepath=args["blend"])
+
+
+def render_shards(blender, blend_path, out_dir, shards, threads=0):
+    """ワーカーを同時に起動し、終わった順に経過時間を記録する"""
+    output = os.path.join(os.path.abspath(out_dir), FRAME_PATTERN)
+    running = {}
+    for shard in shards:
+        command = [blender, "--background", blend_path, "--render-output", output]
+        if threads:
+            command += ["--threads", str(threads)]
+        # -s / -e は -a より前に置く（引数は順に処理される）
+        command += ["--frame-start", str(shard.start), "--frame-end", str(shard.end), "--render-anim"]
+        log = open(os.path.join(out_dir, f"worker_{shard.worker}.log"), "w")
+        process = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT)
+        running[process] = (shard, time.perf_counter(), log)
+
+    while running:
+        for process in list(running):
+            if process.poll() is None:
+                continue
+            shard, started, log = running.pop(process)
+            shard.seconds = time.perf_counter() - started
+            shard.returncode = process.returncode
+            log.close()
+        time.sleep(0.2)
+    return shards
+
+
+def missing_frames(out_dir, start, end):
+    return [f for f in range(start, end + 1) if not os.path.exists(os.path.join(out_dir, f"frame_{f:04d}.png"))]
+
+
+def encode_video(out_dir, start, fps, video_path):
+    """ffmpeg で連番画像を動画にする。ffmpeg が無ければ False"""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return False
+    subprocess.run(
+        [ffmpeg, "-y", "-loglevel", "error", "-framerate", str(fps), "-start_number", str(start),
+         "-i", os.path.join(out_dir, "frame_%04d.png"), "-pix_fmt", "yuv420p", video_path],
+        check=True,
+    )
+    return True
+
+
+def parse_frames(text):
+    start, _, end = text.partition("-")
+    return int(start), int(end or start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a Git Xmas Tree with several background Blender workers")
+    parser.add_argument("repo", help="Repository to visualize")
+    parser.add_argument("--blender", default=shutil.which("blender") or "blender", help="Blender executable")
+    parser.add_argument("--out", default="renders", help="Output directory for frames and logs")
+    parser.add_argument("--frames", default="1-250", help="Frame range, e.g. 1-250")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 4), help="Number of Blender processes")
+    parser.add_argument("--threads", type=int, default=0, help="Render threads per worker (0: Blender default)")
+    parser.add_argument("--engine", default="CYCLES", help="Render engine identifier")
+    parser.add_argument("--resolution", default="1920x1080", help="Resolution, e.g. 1920x1080")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-timeline", action="store_true", help="Do not bake the growth animation")
+    parser.add_argument("--blend", help="Reuse this .blend instead of generating one")
+    parser.add_argument("--video", help="Encode the frames into this video file with ffmpeg")
+    parser.add_argument("--fps", type=int, default=24)
+    args = parser.parse_args(argv)
+
+    start, end = parse_frames(args.frames)
+    os.makedirs(args.out, exist_ok=True)
+
+    blend_path = args.blend or os.path.join(os.path.abspath(args.out), "tree.blend")
+    if not args.blend:
+        width, _, height = args.resolution.partition("x")
+        began = time.perf_counter()
+        try:
+            generate_blend(args.blender, args.repo, blend_path, {
+                "seed": args.seed,
+                "timeline": not args.no_timeline,
+                "frame_start": start,
+                "frame_end": end,
+                "engine": args.engine,
+                "resolution": [int(width), int(height)],
+            })
+        except subprocess.CalledProcessError as e:
+            print(f"tree generation failed (exit code {e.returncode}); nothing was rendered", file=sys.stderr)
+            return 1
+        print(f"generated {blend_path} ({time.perf_counter() - began:.1f}s)")
+
+    began = time.perf_counter()
+    shards = render_shards(args.blender, blend_path, args.out, split_frames(start, end, args.workers), args.threads)
+    elapsed = time.perf_counter() - began
+    for shard in shards:
+        status = "ok" if shard.returncode == 0 else f"failed ({shard.returncode})"
+        print(f"worker {shard.worker}: frames {shard.start}-{shard.end}, {shard.seconds:.1f}s, {shard.fps:.2f} frames/s, {status}")
+    total = end - start + 1
+    print(f"total: {total} frames in {elapsed:.1f}s ({total / elapsed:.2f} frames/s)")
+
+    missing = missing_frames(args.out, start, end)
+    if missing:
+        print(f"missing {len(missing)} frames, first: {missing[0]}", file=sys.stderr)
+        return 1
+    if args.video:
+        if encode_video(args.out, start, args.fps, args.video):
+            print(f"video: {args.video}")
+        else:
+            print("ffmpeg not found; frames are left as a PNG sequence", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""Blender を使わずにツリーのスナップショット（SVG / PNG）を書き出す
+
+ダッシュボード用に、多数のリポジトリをプロセスプールでまとめて処理する。
+
+    python -m git_xmas_tree.snapshot REPO [REPO ...] --out DIR --format png --workers 8
+"""
+import argparse
+import hashlib
+import os
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from .commit_graph import load_commits_from_graph
+from .layout import BranchLayout, EngineLayout, TreeLayout
+from .layout_engines import ENGINES
+from .loader import find_repos
+from .stats import history_stats
+
+PALETTE = [
+    (255, 217, 51),
+    (230, 51, 51),
+    (77, 128, 255),
+    (204, 204, 230),
+    (179, 77, 204),
+    (51, 204, 77),
+]
+BACKGROUND = (16, 24, 32)
+EDGE_COLOR = (51, 153, 64)
+MARGIN = 16
+# branch / tree はそれぞれの Layout クラス、残りは登録されたレイアウトエンジン
+LAYOUT_NAMES = ["branch", "tree", *(name.lower() for name in ENGINES if name not in ('BRANCH', 'TREE'))]
+
+
+def project(positions, view='FRONT'):
+    """3D 座標を正投影して (N, 2) の平面座標にする（v は上向き）"""
+    x, y, z = positions[:, 0], positions[:, 1], positions[:, 2]
+    if view == 'TOP':
+        return np.column_stack((x, y))
+    if view == 'SIDE':
+        return np.column_stack((y, z))
+    if view == 'ISO':
+        # 等角投影（Z 軸まわりに 45 度、見下ろし約 35 度）
+        u = (x - y) * np.cos(np.pi / 4)
+        v = z * np.cos(np.radians(35.264)) + (x + y) * np.sin(np.pi / 4) * np.sin(np.radians(35.264))
+        return np.column_stack((u, v))
+    return np.column_stack((x, z))
+
+
+def fit_to_canvas(points, width, height, margin=MARGIN):
+    """平面座標をキャンバスのピクセル座標に収める（y は下向き）"""
+    if len(points) == 0:
+        return points
+    low = points.min(axis=0)
+    span = np.maximum(points.max(axis=0) - low, 1e-9)
+    scale = min((width - 2 * margin) / span[0], (height - 2 * margin) / span[1])
+    pixels = (points - low) * scale
+    # 余った方向は中央に寄せる
+    pixels[:, 0] += (width - span[0] * scale) / 2
+    pixels[:, 1] = height - ((height - span[1] * scale) / 2 + pixels[:, 1])
+    return pixels
+
+
+def node_colors(layout, commits, branch_ids=None):
+    """ノードの色。branch_ids（最初の親で辿ったブランチ、無ければ -1）があればブランチごと、
+    無ければレーンごと、どちらも無ければ ref 名から決める"""
+    lanes = getattr(layout, "lanes", None)
+    if branch_ids is not None:
+        keys = np.asarray(branch_ids, dtype=np.int64) + 1
+    elif lanes is not None:
+        keys = np.abs(lanes).astype(np.int64)
+    else:
+        keys = np.fromiter((zlib.crc32(c.branch.encode()) for c in commits), dtype=np.int64, count=len(commits))
+    return [PALETTE[k % len(PALETTE)] for k in keys.tolist()]
+
+
+def write_svg(path, pixels, edges, colors, width, height, radius=2.0):
+    """要素ごとにファイルへ書き出す（文書全体をメモリに持たない）"""
+    with open(path, "w", encoding="utf-8", buffering=1 << 16) as f:
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">\n')
+        f.write(f'<rect width="100%" height="100%" fill="{_hex(BACKGROUND)}"/>\n')
+        f.write(f'<g stroke="{_hex(EDGE_COLOR)}" stroke-width="1" stroke-opacity="0.6">\n')
+        points = pixels.tolist()
+        for a, b in edges.tolist():
+            (x1, y1), (x2, y2) = points[a], points[b]
+            f.write(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}"/>\n')
+        f.write("</g>\n")
+        for (x, y), color in zip(points, colors):
+            f.write(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="{radius}" fill="{_hex(color)}"/>\n')
+        f.write("</svg>\n")
+
+
+def write_png(path, pixels, edges, colors, width, height, radius=2):
+    """純 Python のラスタライザで描いて PNG に書き出す（メモリはキャンバス分だけ）"""
+    canvas = bytearray(bytes(BACKGROUND) * (width * height))
+    points = [(int(round(x)), int(round(y))) for x, y in pixels.tolist()]
+    edge_pixel = bytes(EDGE_COLOR)
+    for a, b in edges.tolist():
+        _draw_line(canvas, width, height, points[a], points[b], edge_pixel)
+    for point, color in zip(points, colors):
+        _draw_disc(canvas, width, height, point, radius, bytes(color))
+
+    stride = width * 3
+    raw = b"".join(b"\x00" + bytes(canvas[row * stride:(row + 1) * stride]) for row in range(height))
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        _write_chunk(f, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        _write_chunk(f, b"IDAT", zlib.compress(raw, 6))
+        _write_chunk(f, b"IEND", b"")
+
+
+def _draw_line(canvas, width, height, p0, p1, pixel):
+    # Bresenham
+    x0, y0 = p0
+    x1, y1 = p1
+    dx, dy = abs(x1 - x0), -abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+    err = dx + dy
+    while True:
+        if 0 <= x0 < width and 0 <= y0 < height:
+            offset = (y0 * width + x0) * 3
+            canvas[offset:offset + 3] = pixel
+        if x0 == x1 and y0 == y1:
+            return
+        e2 = 2 * err
+        if e2 >= dy:
+            err += dy
+            x0 += sx
+        if e2 <= dx:
+            err += dx
+            y0 += sy
+
+
+def _draw_disc(canvas, width, height, center, radius, pixel):
+    cx, cy = center
+    for y in range(max(0, cy - radius), min(height, cy + radius + 1)):
+        for x in range(max(0, cx - radius), min(width, cx + radius + 1)):
+            if (x - cx) ** 2 + (y - cy) ** 2 <= radius * radius:
+                offset = (y * width + x) * 3
+                canvas[offset:offset + 3] = pixel
+
+
+def _write_chunk(f, kind, data):
+    f.write(struct.pack(">I", len(data)))
+    f.write(kind)
+    f.write(data)
+    f.write(struct.pack(">I", zlib.crc32(kind + data)))
+
+
+def _hex(color):
+    return "#{:02x}{:02x}{:02x}".format(*color)
+
+
+def make_layout(commits, depths, layout_name='branch', seed=0):
+    if layout_name == 'tree':
+        return TreeLayout(commits, seed=seed)
+    if layout_name == 'branch':
+        return BranchLayout(commits, depths=depths)
+    # その他は layout_engines に登録されたエンジン名（小文字）
+    return EngineLayout(commits, layout_name.upper(), depths=depths, seed=seed)
+
+
+def layout_edges(layout, commits):
+    if hasattr(layout, "edge_array"):
+        return layout.edge_array()
+    index = {c.hash: i for i, c in enumerate(commits)}
+    edges = [(index[p], i) for i, c in enumerate(commits) for p in c.parents if p in index]
+    return np.array(edges, dtype=np.int32).reshape(-1, 2)
+
+
+def snapshot_repo(repo_path, out_path, fmt='svg', layout_name='branch', view='FRONT', width=1024, height=1024):
+    """1リポジトリ分のスナップショットを書き出し、統計を返す（プロセスプールから呼ばれる）"""
+    start = time.perf_counter()
+    commits, depths = load_commits_from_graph(repo_path)
+    if not commits:
+        return {"repo": repo_path, "commits": 0, "path": None, "seconds": time.perf_counter() - start}
+
+    layout = make_layout(commits, depths, layout_name)
+    pixels = fit_to_canvas(project(layout.positions_array(), view), width, height)
+    edges = layout_edges(layout, commits)
+    # レイアウトに依らずブランチで色分けする（tree / pentagon にはレーンが無い）
+    colors = node_colors(layout, commits, history_stats(repo_path, commits).branch_ids)
+
+    writer = write_png if fmt == 'png' else write_svg
+    writer(out_path, pixels, edges, colors, width, height)
+    return {"repo": repo_path, "commits": len(commits), "path": out_path, "seconds": time.perf_counter() - start}
+
+
+def output_names(repos):
+    """リポジトリごとの出力名。ディレクトリ名が重なるものは絶対パスの短いハッシュを付けて分ける"""
+    paths = list(dict.fromkeys(os.path.abspath(repo) for repo in repos))
+    counts = {}
+    for path in paths:
+        name = os.path.basename(os.path.normpath(path))
+        counts[name] = counts.get(name, 0) + 1
+    names = {}
+    for path in paths:
+        name = os.path.basename(os.path.normpath(path))
+        if counts[name] > 1:
+            name = f"{name}-{hashlib.sha1(path.encode()).hexdigest()[:8]}"
+        names[path] = name
+    return names
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write Git Xmas Tree snapshots without Blender")
+    parser.add_argument("repos", nargs="*", help="Repositories to render")
+    parser.add_argument("--scan", help="Render every repository directly under this directory")
+    parser.add_argument("--out", default=".", help="Output directory")
+    parser.add_argument("--format", choices=["svg", "png"], default="svg")
+    parser.add_argument("--layout", choices=LAYOUT_NAMES, default="branch")
+    parser.add_argument("--view", choices=["FRONT", "SIDE", "TOP", "ISO"], default="FRONT")
+    parser.add_argument("--size", type=int, default=1024, help="Image width and height in pixels")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    args = parser.parse_args(argv)
+
+    repos = list(args.repos)
+    if args.scan:
+        repos.extend(find_repos(args.scan))
+    if not repos:
+        parser.error("no repositories given")
+    os.makedirs(args.out, exist_ok=True)
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {}
+        # 同じリポジトリは1度だけ、別のリポジトリが同じファイルに上書きしないようにする
+        for repo, name in output_names(repos).items():
+            out_path = os.path.join(args.out, f"{name}.{args.format}")
+            future = pool.submit(snapshot_repo, repo, out_path, args.format, args.layout, args.view, args.size, args.size)
+            futures[future] = repo
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"{futures[future]}: failed: {e}", file=sys.stderr)
+                continue
+            print(f"{result['repo']}: {result['commits']} commits -> {result['path']} ({result['seconds']:.2f}s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""git log を1回読む間にブランチ・作者・週ごとの統計を集計する
+
+ブランチの所属は ref の先端から最初の親を辿って決める。git log は子を先に
+出すので、先端で付けたブランチを最初の親に「予約」しておき、その親が出てきた
+ときに受け取る。予約は各ブランチの次の1コミット分だけなので、集計のための
+状態はブランチ数・作者数・週数に比例する量で済む。
+"""
+import subprocess
+from array import array
+import numpy as np
+from .git_parser import Commit, LogFilter
+
+WEEK = 7 * 24 * 60 * 60
+
+
+def fetch_branch_tips(repo_path):
+    """ブランチの先端 {コミット: ブランチ名} と、幹として優先するブランチ名（タグは除く）"""
+    refs = subprocess.check_output(
+        ["git", "for-each-ref", "--format=%(objectname)%09%(HEAD)%09%(refname:short)%09%(symref:short)", "refs/heads", "refs/remotes"],
+        cwd=repo_path,
+        encoding='utf-8',
+        text=True,
+    ).splitlines()
+    entries = []
+    head = ""
+    remote_default = ""
+    for ref in refs:
+        oid, current, name, symref = ref.split("\t")
+        if symref:
+            # origin/HEAD はリモートの既定ブランチを指すだけなので先端には数えない
+            remote_default = remote_default or symref
+            continue
+        if current == "*":
+            head = name
+        entries.append((oid, name))
+
+    primary = _primary_branch({name for _, name in entries}, remote_default, head)
+    # 幹のブランチを先に登録し、同じコミットを指す他のブランチより優先する
+    tips = {}
+    for oid, name in sorted(entries, key=lambda entry: entry[1] != primary):
+        tips.setdefault(oid, name)
+    return tips, primary
+
+
+def _primary_branch(names, remote_default, head):
+    """リモートの既定ブランチ → main / master → HEAD の順に幹を決める"""
+    candidates = []
+    if remote_default:
+        candidates += [remote_default.partition("/")[2], remote_default]
+    candidates += ["main", "master", head]
+    return next((name for name in candidates if name in names), "")
+
+
+class HistoryStats:
+    """コミットを新しい順に add() し、最後に finish() で配列にする"""
+
+    def __init__(self, tips, primary=""):
+        self.tips = tips
+        self.primary = primary
+        self.branch_names = []
+        self.author_names = []
+        self._branch_index = {}
+        self._author_index = {}
+        self._claims = {}  # 最初の親 -> 予約したブランチ
+        self._week_counts = {}
+        self._branch_ids = array('i')
+        self._author_ids = array('i')
+        self._weeks = array('q')
+
+    def add(self, hash, parents, time, author):
+        branch = self._claims.pop(hash, None)
+        if hash in self.tips:
+            # 子から辿ってきたブランチより、ここを先端とするブランチの方が優先なら付け替える
+            tip = self._index(self._branch_index, self.branch_names, self.tips[hash])
+            if branch is None or self._rank(tip) < self._rank(branch):
+                branch = tip
+        if branch is not None and parents:
+            # 同じ親を複数のブランチが辿ってきたら優先度の高い方が引き継ぐ
+            claimed = self._claims.get(parents[0])
+            if claimed is None or self._rank(branch) < self._rank(claimed):
+                self._claims[parents[0]] = branch
+        week = time // WEEK
+        self._week_counts[week] = self._week_counts.get(week, 0) + 1
+        self._branch_ids.append(-1 if branch is None else branch)
+        self._author_ids.append(self._index(self._author_index, self.author_names, author))
+        self._weeks.append(week)
+
+    def finish(self):
+        """commits と同じ古い順の配列を作る"""
+        self.branch_ids = np.frombuffer(self._branch_ids, dtype=np.int32)[::-1].copy()
+        self.author_ids = np.frombuffer(self._author_ids, dtype=np.int32)[::-1].copy()
+        weeks = np.frombuffer(self._weeks, dtype=np.int64)[::-1]
+        self.first_week = int(weeks.min()) if len(weeks) else 0
+        self.week_ids = (weeks - self.first_week).astype(np.int32)
+
+        self.week_counts = np.zeros(int(self.week_ids.max()) + 1 if len(weeks) else 0, dtype=np.int64)
+        for week, count in self._week_counts.items():
+            self.week_counts[week - self.first_week] = count
+        self.author_counts = np.bincount(self.author_ids, minlength=len(self.author_names))
+        branched = self.branch_ids[self.branch_ids >= 0]
+        self.branch_counts = np.bincount(branched, minlength=len(self.branch_names))
+
+        self._claims.clear()
+        self._branch_ids = self._author_ids = self._weeks = None
+        return self
+
+    def _rank(self, branch):
+        # 幹のブランチが最優先、他は先端が新しい（先に現れた）順
+        return -1 if self.branch_names[branch] == self.primary else branch
+
+    @staticmethod
+    def _index(index, names, name):
+        i = index.get(name)
+        if i is None:
+            i = index[name] = len(names)
+            names.append(name)
+        return i
+
+    def activity(self):
+        """コミットごとの活発さ 0〜1（そのコミットの週のコミット数 / 最多の週）"""
+        if not len(self.week_counts):
+            return np.zeros(0, dtype=np.float64)
+        return self.week_counts[self.week_ids] / self.week_counts.max()
+
+    def branch_name(self, index):
+        branch = self.branch_ids[index]
+        return self.branch_names[branch] if branch >= 0 else ""
+
+
+def load_topology_with_stats(repo_path, log_filter=None):
+    """load_topology と同じ commits に加えて HistoryStats を返す（git log は1回だけ）"""
+    log_filter = log_filter or LogFilter()
+    stats = HistoryStats(*fetch_branch_tips(repo_path))
+    commits = []
+    # 子→親の順に流れてくる行をそのまま集計する（--reverse は付けない）
+    process = subprocess.Popen(
+        [
+            "git", "log", "--pretty=format:%H %P %ct%x09%aN",
+            *log_filter.rev_args(),
+            *log_filter.path_args(),
+        ],
+        cwd=repo_path,
+        stdout=subprocess.PIPE,
+        encoding='utf-8',
+        errors='replace',
+        text=True,
+    )
+    with process.stdout:
+        for line in process.stdout:
+            topology, _, author = line.rstrip("\n").partition("\t")
+            parts = topology.split()
+            commit = Commit(parts[0], parts[1:-1], int(parts[-1]), "", "")
+            stats.add(commit.hash, commit.parents, commit.time, author)
+            commits.append(commit)
+    if process.wait() != 0:
+        raise subprocess.CalledProcessError(process.returncode, "git log")
+
+    commits.reverse()
+    return commits, stats.finish()
+
+
+def history_stats(repo_path, commits):
+    """読み込み済みの commits（親が先の順）から HistoryStats を作る（git log は読み直さない）
+
+    snapshot のように load_commits_from_graph で読んだコミットに、最初の親で辿った
+    ブランチを付けるのに使う。作者は読まないので全て空の名前として数える。
+    """
+    stats = HistoryStats(*fetch_branch_tips(repo_path))
+    for commit in reversed(commits):
+        stats.add(commit.hash, commit.parents, commit.time, "")
+    return stats.finish()
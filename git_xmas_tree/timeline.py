@@ -0,0 +1,78 @@
+import bpy
+import numpy as np
+from bpy_extras import anim_utils
+
+
+def growth_frames(times, frame_start=1, frame_end=250):
+    """コミット時刻をフレーム番号に線形に割り当てる（古いコミットほど早く現れる）"""
+    times = np.asarray(times, dtype=np.int64)
+    if len(times) == 0:
+        return np.zeros(0, dtype=np.int32)
+    t_min = times.min()
+    t_range = max(1, int(times.max() - t_min))
+    frames = frame_start + (times - t_min) / t_range * (frame_end - frame_start)
+    return np.rint(frames).astype(np.int32)
+
+
+def bake_growth(objects, frames, grow_length=10):
+    """各オブジェクトが指定フレームで scale 0→1 に育つアニメーションを付ける
+
+    keyframe_insert はオブジェクトごとに遅いので、同じフレームに現れる
+    オブジェクトで1つのアクションを共有し、キーフレームは
+    keyframe_points.add + foreach_set でまとめて書き込む。
+    アクション数はオブジェクト数ではなくフレーム数で抑えられる。
+    """
+    actions = {}
+    for obj, frame in zip(objects, frames.tolist()):
+        if frame not in actions:
+            actions[frame] = _make_growth_action(frame, grow_length)
+        action, slot = actions[frame]
+        anim = obj.animation_data_create()
+        anim.action = action
+        anim.action_slot = slot
+    return len(actions)
+
+
+def _make_growth_action(frame, grow_length):
+    action = bpy.data.actions.new(f"GitXmasGrow_{frame}")
+    slot = action.slots.new(id_type='OBJECT', name="Commit")
+    channelbag = anim_utils.action_ensure_channelbag_for_slot(action, slot)
+    co = (frame - grow_length, 0.0, frame, 1.0)
+    for index in range(3):
+        fcurve = channelbag.fcurves.new("scale", index=index)
+        fcurve.keyframe_points.add(2)
+        fcurve.keyframe_points.foreach_set("co", co)
+        fcurve.update()
+    return action, slot
+
+
+def bake_polyline_growth(objects, point_frames, grow_length=10):
+    """まとめたポリラインを、各点のコミットのフレームに合わせて根元から伸ばす
+
+    bevel_factor_end を区間の数で割り当て（SEGMENTS）、k 番目の点のフレームで
+    k / 区間数 まで伸びるキーフレームを書く。最初の点は親なので、2番目の点の
+    フレームの grow_length 前から伸び始める。
+    """
+    for obj, frames in zip(objects, point_frames):
+        segments = len(frames) - 1
+        # 親より時刻が古いコミットがあっても縮まないようにフレームを単調にする
+        ends = np.maximum.accumulate(np.asarray(frames[1:], dtype=np.float64))
+        keys = np.concatenate(([ends[0] - grow_length], ends))
+        values = np.arange(segments + 1) / segments
+        # 同じフレームに複数の点が現れるときは一番先まで伸ばしたキーだけ残す
+        last = np.append(keys[1:] != keys[:-1], True)
+        co = np.column_stack((keys[last], values[last])).ravel()
+
+        curve = obj.data
+        curve.bevel_factor_mapping_end = 'SEGMENTS'
+        action = bpy.data.actions.new(f"GitXmasGrowCurve_{curve.name}")
+        slot = action.slots.new(id_type='CURVE', name="Branch")
+        channelbag = anim_utils.action_ensure_channelbag_for_slot(action, slot)
+        fcurve = channelbag.fcurves.new("bevel_factor_end")
+        fcurve.keyframe_points.add(len(co) // 2)
+        fcurve.keyframe_points.foreach_set("co", co)
+        fcurve.update()
+        anim = curve.animation_data_create()
+        anim.action = action
+        anim.action_slot = slot
+    return len(objects)
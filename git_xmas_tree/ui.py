@@ -1,4 +1,5 @@
 import bpy
+from .chunked import chunk_progress
 
 class GITXMASS_PT_panel(bpy.types.Panel):
     bl_label = "Git Xmas Tree"
@@ -22,6 +23,88 @@ class GITXMASS_PT_panel(bpy.types.Panel):
         box.prop(scene, "tree_max_z")
         box.prop(scene, "tree_branch_spacing")
         box.prop(scene, "tree_commit_spacing")
+        box.prop(scene, "tree_layout_engine")
+        row = box.row()
+        row.enabled = scene.tree_layout_engine == 'BRANCH'
+        row.prop(scene, "tree_lane_mode")
+        box.prop(scene, "tree_seed")
+        box.prop(scene, "tree_object_names")
+        box.prop(scene, "tree_activity")
+        box.prop(scene, "tree_simplify_edges")
+        row = box.row()
+        row.enabled = scene.tree_simplify_edges
+        row.prop(scene, "tree_bundle_merges")
+        
+        # 履歴の絞り込み（git 側でフィルタする）
+        box = layout.box()
+        box.label(text="History Filter:", icon='FILTER')
+        box.prop(scene, "tree_since")
+        box.prop(scene, "tree_until")
+        box.prop(scene, "tree_include_refs")
+        box.prop(scene, "tree_exclude_refs")
+        box.prop(scene, "tree_pathspec")
+        box.prop(scene, "tree_first_parent")
+        box.prop(scene, "tree_use_commit_graph")
+        
+        # 成長アニメーション
+        box = layout.box()
+        box.label(text="Animation:", icon='TIME')
+        box.prop(scene, "tree_timeline")
+        row = box.row()
+        row.enabled = scene.tree_timeline
+        row.prop(scene, "tree_grow_length")
+        
+        # チャンク単位の生成（途中から再開できる）
+        box = layout.box()
+        box.label(text="Large Trees:", icon='MOD_ARRAY')
+        box.prop(scene, "tree_layout_workers")
+        box.prop(scene, "tree_chunked")
+        col = box.column()
+        col.enabled = scene.tree_chunked
+        col.prop(scene, "tree_chunk_size")
+        col.prop(scene, "tree_chunk_save")
+        progress = chunk_progress(scene, scene.repo_path)
+        if progress is not None:
+            col.label(text=f"Chunks built: {progress[0]} / {progress[1]}")
+        
+        # 生成前の見積もり
+        box = layout.box()
+        box.label(text="Guardrails:", icon='INFO')
+        box.prop(scene, "tree_preflight")
+        row = box.row()
+        row.enabled = scene.tree_preflight
+        row.prop(scene, "tree_max_objects")
+        row.prop(scene, "tree_max_seconds")
+        
+        # メモリ使用量の記録
+        box = layout.box()
+        box.label(text="Diagnostics:", icon='MEMORY')
+        box.prop(scene, "tree_memory_report")
+        col = box.column()
+        col.enabled = scene.tree_memory_report
+        col.prop(scene, "tree_memory_report_path")
+        summary = scene.get("git_xmas_memory")
+        if summary:
+            for name, mb in summary["stages"].items():
+                col.label(text=f"{name}: {mb:.1f} MB")
+            col.label(text=f"Peak: {summary['peak_mb']:.1f} MB ({summary['bytes_per_commit']:.0f} B/commit)")
         
         # 生成ボタン
         layout.operator("gitxmas.generate", icon="OUTLINER_OB_GROUP_INSTANCE")
+        layout.operator("gitxmas.pick", icon="EYEDROPPER")
+        layout.operator("gitxmas.export_gltf", icon="EXPORT")
+        
+        # 複数リポジトリの森
+        box = layout.box()
+        box.label(text="Forest:", icon='OUTLINER_COLLECTION')
+        box.prop(scene, "forest_path")
+        box.prop(scene, "forest_max_jobs")
+        box.prop(scene, "forest_timeout")
+        box.prop(scene, "forest_spacing")
+        box.operator("gitxmas.generate_forest", icon="FORCE_FORCE")
+        
+        # プレビュー（オブジェクトを作らない）
+        row = layout.row(align=True)
+        row.operator("gitxmas.preview", icon="HIDE_OFF")
+        row.operator("gitxmas.convert_preview", icon="MESH_DATA")
+        row.operator("gitxmas.clear_preview", text="", icon="X")
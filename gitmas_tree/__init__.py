@@ -3,6 +3,8 @@ import tomllib
 import bpy
 from .func import GITMASTREE_OT_generate
 from .ui import GITMASTREE_PT_panel
+from . import git_pool
+from .layout_engines import engine_items
 
 PACKAGE_PATH = pathlib.Path(__file__).parent
 MANIFEST_PATH = PACKAGE_PATH / "blender_manifest.toml"
@@ -29,13 +31,67 @@ def register():
         min=0,
         max=500
     )
+    bpy.types.Scene.gitmas_preflight = bpy.props.BoolProperty(
+        name="生成前に見積もる",
+        description="生成前にコミット数を数えて、オブジェクト数と時間を表示します",
+        default=True
+    )
+    bpy.types.Scene.gitmas_max_objects = bpy.props.IntProperty(
+        name="オブジェクト上限",
+        description="見積もりがこれを超えるとコミット数を減らすよう勧めます",
+        default=1000,
+        min=10
+    )
+    bpy.types.Scene.gitmas_since = bpy.props.StringProperty(
+        name="開始日",
+        description="この日時以降のコミットのみ使用します(例: 2025-01-01, 6 months ago)",
+    )
+    bpy.types.Scene.gitmas_until = bpy.props.StringProperty(
+        name="終了日",
+        description="この日時以前のコミットのみ使用します",
+    )
+    bpy.types.Scene.gitmas_include_refs = bpy.props.StringProperty(
+        name="対象ref",
+        description="辿るrefのパターン(カンマ区切り, 例: heads/main, tags/v*)。空なら全て",
+    )
+    bpy.types.Scene.gitmas_exclude_refs = bpy.props.StringProperty(
+        name="除外ref",
+        description="除外するrefのパターン(カンマ区切り, 例: heads/wip/*)",
+    )
+    bpy.types.Scene.gitmas_first_parent = bpy.props.BoolProperty(
+        name="第一親のみ",
+        description="マージコミットの第一親だけを辿ります",
+        default=False
+    )
+    bpy.types.Scene.gitmas_pathspec = bpy.props.StringProperty(
+        name="パス",
+        description="このパスを変更したコミットのみ使用します(カンマ区切り)",
+    )
+    bpy.types.Scene.gitmas_layout_engine = bpy.props.EnumProperty(
+        name="レイアウト",
+        description="コミットを配置するレイアウトエンジン(葉のリングは5角形のときだけ作ります)",
+        items=engine_items(),
+        default="PENTAGON"
+    )
 
 def unregister():
     del bpy.types.Scene.gitmas_repo_path
     del bpy.types.Scene.gitmas_commits_count
+    del bpy.types.Scene.gitmas_preflight
+    del bpy.types.Scene.gitmas_max_objects
+    del bpy.types.Scene.gitmas_since
+    del bpy.types.Scene.gitmas_until
+    del bpy.types.Scene.gitmas_include_refs
+    del bpy.types.Scene.gitmas_exclude_refs
+    del bpy.types.Scene.gitmas_first_parent
+    del bpy.types.Scene.gitmas_pathspec
+    del bpy.types.Scene.gitmas_layout_engine
 
     for cls in classes:
         bpy.utils.unregister_class(cls)
+    
+    # 常駐させた git プロセスを終了する
+    git_pool.shutdown()
 
 if __name__ == "__main__":
     register()
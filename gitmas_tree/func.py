@@ -1,6 +1,7 @@
 import os
 import bpy
 from . import git_parser
+from . import preflight
 from . import tree_generator
 
 class GITMASTREE_OT_generate(bpy.types.Operator):
@@ -8,21 +9,75 @@ class GITMASTREE_OT_generate(bpy.types.Operator):
     bl_label = "Generate"
     bl_description = "Git履歴からクリスマスツリーを生成します"
 
+    commit_count: bpy.props.IntProperty(
+        name="コミット数",
+        description="今回の生成に使うコミット数",
+        default=-1,
+        options={"SKIP_SAVE"},
+    )
+
+    def invoke(self, context, event):
+        scene = context.scene
+        repo_path = scene.gitmas_repo_path
+        if not self._check_repo(repo_path):
+            return {"CANCELLED"}
+        if not scene.gitmas_preflight:
+            return self.execute(context)
+
+        # 履歴を読む前にコミット数だけ数えて、重すぎるときは減らした数を勧める
+        count = preflight.count_commits(repo_path, scene.gitmas_commits_count, _log_filter(scene))
+        self.estimate = preflight.estimate_build(count, scene.gitmas_layout_engine)
+        self.commit_count = preflight.recommend_commit_count(self.estimate, scene.gitmas_max_objects)
+        return context.window_manager.invoke_props_dialog(self, width=320)
+
+    def draw(self, context):
+        layout = self.layout
+        estimate = self.estimate
+        col = layout.column(align=True)
+        col.label(text=f"コミット数: {estimate.commits:,}")
+        col.label(text=f"オブジェクト: 約{estimate.objects:,}  マテリアル: 約{estimate.materials:,}")
+        col.label(text=f"頂点数: 約{estimate.vertices:,}")
+        if estimate.rings:
+            col.label(text=f"葉のリング: 約{estimate.rings:,}（面 約{estimate.leaf_faces:,}）")
+        col.label(text=f"生成時間: 約{estimate.seconds:.0f}秒")
+        if self.commit_count < estimate.commits:
+            layout.label(text="上限を超えるためコミット数を減らします", icon="ERROR")
+        layout.prop(self, "commit_count")
+
     def execute(self, context):
-        repo_path = context.scene.gitmas_repo_path
+        scene = context.scene
+        repo_path = scene.gitmas_repo_path
+        if not self._check_repo(repo_path):
+            return {"CANCELLED"}
+
+        commit_count = self.commit_count if self.commit_count >= 0 else scene.gitmas_commits_count
+        commits = git_parser.load_topology(repo_path, commit_count, _log_filter(scene))
+        # ラベル（テキスト）に使う件名だけを後からまとめて取る
+        git_parser.fetch_subjects(repo_path, commits)
+        tree_generator.generate(commits, scene.gitmas_layout_engine)
+
+        self.report({"INFO"}, f"{commits}")
+        return {"FINISHED"}
+
+    def _check_repo(self, repo_path):
         if not os.path.exists(repo_path):
             self.report({"ERROR"}, f"パスが存在しません: {repo_path}")
-            return {"CANCELLED"}
+            return False
         if not os.path.isdir(repo_path):
             self.report({"ERROR"}, f"ディレクトリではありません: {repo_path}")
-            return {"CANCELLED"}
+            return False
         if not os.path.isdir(os.path.join(repo_path, ".git")):
             self.report({"ERROR"}, f"Gitリポジトリではありません: {repo_path}")
-            return {"CANCELLED"}
+            return False
+        return True
 
-        commit_count = context.scene.gitmas_commits_count
-        commits = git_parser.load_commits(repo_path, commit_count)
-        tree_generator.generate(commits)
 
-        self.report({"INFO"}, f"{commits}")
-        return {"FINISHED"}
\ No newline at end of file
+def _log_filter(scene):
+    return git_parser.LogFilter.from_text(
+        since=scene.gitmas_since,
+        until=scene.gitmas_until,
+        include_refs=scene.gitmas_include_refs,
+        exclude_refs=scene.gitmas_exclude_refs,
+        first_parent=scene.gitmas_first_parent,
+        pathspec=scene.gitmas_pathspec,
+    )
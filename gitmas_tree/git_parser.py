@@ -1,5 +1,6 @@
 import subprocess
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from .git_pool import get_worker
 
 @dataclass
 class Commit:
@@ -9,9 +10,89 @@ class Commit:
     message: str
     branch: str
 
-def load_commits(repo_path, depth) -> list[Commit]:
+@dataclass
+class LogFilter:
+    """git log に渡す履歴の絞り込み条件"""
+    since: str = ""
+    until: str = ""
+    include_refs: list[str] = field(default_factory=list)
+    exclude_refs: list[str] = field(default_factory=list)
+    first_parent: bool = False
+    pathspec: list[str] = field(default_factory=list)
+
+    @classmethod
+    def from_text(cls, since="", until="", include_refs="", exclude_refs="", first_parent=False, pathspec=""):
+        """パネルのカンマ区切り文字列から作成"""
+        return cls(
+            since=since.strip(),
+            until=until.strip(),
+            include_refs=split_patterns(include_refs),
+            exclude_refs=split_patterns(exclude_refs),
+            first_parent=first_parent,
+            pathspec=split_patterns(pathspec),
+        )
+
+    def rev_args(self):
+        """リビジョン指定部分の引数（pathspec を除く）"""
+        args = []
+        if self.since:
+            args.append(f"--since={self.since}")
+        if self.until:
+            args.append(f"--until={self.until}")
+        if self.first_parent:
+            args.append("--first-parent")
+        if self.pathspec:
+            # 親を絞り込み後のコミットに書き換えて木を繋げたままにする
+            args.append("--parents")
+
+        return args + self.ref_args()
+
+    def ref_args(self, all_refs=("--all",)):
+        """ref の指定部分の引数（include_refs が無いときは all_refs の全体から除外する）"""
+        # --exclude は直後の --all / --glob などにだけ効くので、それぞれの前に並べる
+        excludes = [f"--exclude={_full_ref_pattern(pattern)}" for pattern in self.exclude_refs]
+        args = []
+        if self.include_refs:
+            for pattern in self.include_refs:
+                # git は * ? [ の無い --glob に /* を補うので、そのままの ref 名は通常のリビジョンとして渡す
+                if _is_glob(pattern):
+                    args += [*excludes, f"--glob={_full_ref_pattern(pattern)}"]
+                else:
+                    args.append(_full_ref_pattern(pattern))
+        else:
+            for option in all_refs:
+                args += [*excludes, option]
+        return args
+
+    def path_args(self):
+        """pathspec 部分の引数"""
+        if not self.pathspec:
+            return []
+        return ["--", *self.pathspec]
+
+
+def split_patterns(text):
+    return [p.strip() for p in text.split(",") if p.strip()]
+
+
+def _is_glob(pattern):
+    return any(ch in pattern for ch in "*?[")
+
+
+def _full_ref_pattern(pattern):
+    # "heads/feature/*" のような短い指定は refs/ 配下として扱う
+    return pattern if pattern.startswith("refs/") else f"refs/{pattern}"
+
+
+def load_topology(repo_path, depth, log_filter=None) -> list[Commit]:
+    """第1段階: ハッシュ・親・時刻だけを読む。件名は空のまま"""
+    log_filter = log_filter or LogFilter()
     logs = subprocess.check_output(
-        f"git log --all --reverse -n {depth} --pretty=format:%H|%P|%ct|%s|%D",
+        [
+            "git", "log", "--reverse", f"-n{depth}", "--pretty=format:%H %P %ct",
+            *log_filter.rev_args(),
+            *log_filter.path_args(),
+        ],
         cwd=repo_path,
         encoding="utf-8",
         text=True,
@@ -19,12 +100,17 @@ def load_commits(repo_path, depth) -> list[Commit]:
 
     commits = []
     for log in logs:
-        parts = log.split("|")
-        hash = parts[0]
-        parents = parts[1].split() if parts[1] else []
-        time = int(parts[2])
-        message = parts[3] if len(parts) > 3 else ""
-        branch = parts[4] if len(parts) > 4 else ""
-        commits.append(Commit(hash, parents, time, message, branch))
+        parts = log.split()
+        commits.append(Commit(parts[0], parts[1:-1], int(parts[-1]), "", ""))
 
     return commits
+
+def fetch_subjects(repo_path, commits: list[Commit]):
+    """第2段階: ラベルを表示するコミットの件名だけを常駐の git cat-file から取得する"""
+    targets = [c for c in commits if not c.message]
+    if not targets:
+        return
+    objects = get_worker(repo_path).commits([c.hash for c in targets])
+    for commit, obj in zip(targets, objects):
+        if obj is not None:
+            commit.message = obj.subject
@@ -0,0 +1,343 @@
+"""レイアウトエンジンの共通インターフェース
+
+どのエンジンもコンパクトなコミットグラフ（GraphArrays）を受け取り、座標 (N, 3) と
+辺 (E, 2) の配列（LayoutResult）を返す。NumPy 以外に依存しないので、
+git_xmas_tree と gitmas_tree の両方に同じファイルを置いている（変更は両方に入れる）。
+"""
+import heapq
+import math
+from dataclasses import dataclass, field
+import numpy as np
+
+
+@dataclass
+class GraphArrays:
+    """コミットグラフを配列で持つ（親は CSR 形式、範囲外の親は含めない）"""
+    times: np.ndarray  # int64 (N,)
+    hash_prefixes: np.ndarray  # uint32 (N,) ハッシュ先頭32bit
+    parent_offsets: np.ndarray  # int64 (N + 1,)
+    parent_indices: np.ndarray  # int32 (E,) 先頭が最初の親
+    external_parents: np.ndarray  # bool (N,) 読み込み範囲外に親がある
+    first_parents: np.ndarray  # int32 (N,) 最初の親（無いか範囲外なら -1）
+    depths: np.ndarray = None  # 既知の深さ（commit-graph の世代番号など）
+
+    @classmethod
+    def from_commits(cls, commits, depths=None):
+        """hash / parents / time を持つコミットの列から作る（depths は {hash: 深さ}）"""
+        index = {c.hash: i for i, c in enumerate(commits)}
+        offsets = np.zeros(len(commits) + 1, dtype=np.int64)
+        flat = []
+        external = np.zeros(len(commits), dtype=bool)
+        first = np.full(len(commits), -1, dtype=np.int32)
+        for i, c in enumerate(commits):
+            inside = [index[p] for p in c.parents if p in index]
+            flat.extend(inside)
+            offsets[i + 1] = len(flat)
+            external[i] = len(inside) < len(c.parents)
+            if c.parents:
+                first[i] = index.get(c.parents[0], -1)
+        times, prefixes = commit_arrays(commits)
+        known = None
+        if depths:
+            known = np.fromiter((depths.get(c.hash, 0) for c in commits), dtype=np.int32, count=len(commits))
+        return cls(times, prefixes, offsets, np.array(flat, dtype=np.int32), external, first, known)
+
+    def __len__(self):
+        return len(self.times)
+
+    def parents(self):
+        """コミットごとの親インデックスのリスト"""
+        offsets = self.parent_offsets.tolist()
+        flat = self.parent_indices.tolist()
+        return [flat[offsets[i]:offsets[i + 1]] for i in range(len(self))]
+
+    def edges(self):
+        """(親, 子) の (E, 2) 配列"""
+        children = np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.parent_offsets))
+        return np.column_stack((self.parent_indices, children)).astype(np.int32).reshape(-1, 2)
+
+
+@dataclass
+class LayoutResult:
+    positions: np.ndarray  # float64 (N, 3)
+    edges: np.ndarray  # int32 (E, 2) 親, 子
+    lanes: np.ndarray = None  # レーンを持つエンジンだけ
+    extras: dict = field(default_factory=dict)  # エンジン固有の配列
+
+
+ENGINES = {}
+
+
+def register_engine(cls):
+    """LayoutEngine のサブクラスを name で登録するデコレータ"""
+    ENGINES[cls.name] = cls
+    return cls
+
+
+def get_engine(name):
+    return ENGINES[name]()
+
+
+def engine_items():
+    """EnumProperty の items"""
+    return [(cls.name, cls.label, cls.description) for cls in ENGINES.values()]
+
+
+class LayoutEngine:
+    name = ""
+    label = ""
+    description = ""
+
+    def layout(self, graph, **options):
+        """共通のオプション（max_x, max_y, max_z, seed など）は使うものだけ読む"""
+        raise NotImplementedError
+
+
+def commit_arrays(commits):
+    """コミットの時刻とハッシュ先頭32bitを NumPy 配列にまとめる"""
+    times = np.fromiter((c.time for c in commits), dtype=np.int64, count=len(commits))
+    # 先頭8桁をまとめて bytes にし、ビッグエンディアンの uint32 として一度に解釈する
+    prefixes = np.frombuffer(
+        bytes.fromhex("".join(c.hash[:8] for c in commits)),
+        dtype='>u4',
+    ).astype(np.uint32)
+    return times, prefixes
+
+
+def calculate_depths(parent_indices, initial=None):
+    """深さ（親からの距離）を int32 の配列で返す。initial はルートの深さ"""
+    n = len(parent_indices)
+    # 親が全て確定したコミットから順に処理する（再帰を使わない）
+    depths = [0] * n if initial is None else list(initial)
+    remaining = [len(ps) for ps in parent_indices]
+    children = [[] for _ in range(n)]
+    for i, ps in enumerate(parent_indices):
+        for p in ps:
+            children[p].append(i)
+    ready = [i for i in range(n) if remaining[i] == 0]
+    while ready:
+        i = ready.pop()
+        for child in children[i]:
+            if depths[i] + 1 > depths[child]:
+                depths[child] = depths[i] + 1
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                ready.append(child)
+    return np.array(depths, dtype=np.int32)
+
+
+def assign_active_lanes(parent_indices, depths, depth_order):
+    """アクティブレーン方式でレーンを割り当てる（git log --graph と同じ考え方）
+
+    子→親の順に走査し、子が最初の親のためにレーンを予約して引き継ぐ。
+    空いたレーンはヒープで再利用するので、レーン数は総ブランチ数ではなく
+    同時に存在するブランチ数で抑えられる。
+
+    レーン配列 (int32) と使ったレーン数を返す。
+    """
+    n = len(parent_indices)
+    lanes = np.zeros(n, dtype=np.int32)
+    reserved = {}  # 親のインデックス -> その親のために予約したレーン
+    free_lanes = []
+    released = []
+    next_lane = 0
+    current_depth = None
+
+    def allocate():
+        nonlocal next_lane
+        if free_lanes:
+            return heapq.heappop(free_lanes)
+        next_lane += 1
+        return next_lane - 1
+
+    for i in depth_order[::-1].tolist():
+        # 同じ深さのコミット同士が重ならないよう、解放は深さが変わってから反映する
+        depth = depths[i]
+        if depth != current_depth:
+            for lane in released:
+                heapq.heappush(free_lanes, lane)
+            released.clear()
+            current_depth = depth
+
+        lane = reserved.pop(i, None)
+        if lane is None:
+            # 子の無い先端コミット: 新しいレーン
+            lane = allocate()
+        lanes[i] = lane
+
+        parents = parent_indices[i]
+        if not parents:
+            released.append(lane)
+            continue
+        first = parents[0]
+        if first in reserved:
+            # 既存のレーンへ合流（ここでブランチが分岐している）。時刻や読み込み順に
+            # 依らず幹がレーン0に残るよう、親には小さい方のレーンを引き継がせる
+            if lane < reserved[first]:
+                lane, reserved[first] = reserved[first], lane
+            released.append(lane)
+        else:
+            reserved[first] = lane
+        for parent in parents[1:]:
+            if parent not in reserved:
+                # マージ元のブランチに新しいレーン
+                reserved[parent] = allocate()
+
+    return lanes, next_lane
+
+
+def branch_raw_positions(depths, lanes, branch_spacing=1.0, commit_spacing=1.0):
+    """レーンを中心軸の周りに円錐状に並べた、スケーリング前の座標"""
+    depth = depths.astype(np.float64)
+    max_depth = float(depth.max()) if len(depth) else 0.0
+    # Z軸: 深いコミットほど下に
+    z = (max_depth - depth) * commit_spacing
+    # 半径は下に行くほど広がる
+    depth_ratio = depth / max_depth if max_depth > 0 else np.zeros_like(depth)
+    base_spacing = branch_spacing * (1 + depth_ratio * 2)
+    lane = lanes.astype(np.float64)
+    # lane=0 は半径0なので自然に原点になる（8レーンで1周）
+    angle = lane * (2 * math.pi / 8)
+    radius = np.abs(lane) * base_spacing
+    return np.column_stack((radius * np.cos(angle), radius * np.sin(angle), z))
+
+
+def fit_bounds(raw, max_x, max_y, max_z):
+    """アスペクト比を保ったまま範囲に収める (scale, offset_z)。XY は中心化しない"""
+    low = raw.min(axis=0)
+    span = raw.max(axis=0) - low
+    # スケーリング係数（範囲が0の場合は1.0）
+    scale_x = (max_x * 2) / span[0] if span[0] > 0 else 1.0
+    scale_y = (max_y * 2) / span[1] if span[1] > 0 else 1.0
+    scale_z = max_z / span[2] if span[2] > 0 else 1.0
+    return float(min(scale_x, scale_y, scale_z)), float(low[2])
+
+
+def fit_positions(raw, max_x, max_y, max_z):
+    if not len(raw):
+        return raw
+    scale, offset_z = fit_bounds(raw, max_x, max_y, max_z)
+    positions = raw - (0.0, 0.0, offset_z)
+    positions *= scale
+    return positions
+
+
+def tree_positions(times, hash_prefixes, seed=0, height=6.0, base_radius=2.0, radius_power=0.75):
+    """コミット時刻を高さ、ハッシュを角度にした円錐配置（揺らぎは seed で固定）"""
+    t_min = int(times.min()) if len(times) else 0
+    t_range = max(1, int(times.max()) - t_min) if len(times) else 1
+    z_norm = (times - t_min) / t_range
+    r_max = (1.0 - z_norm) ** radius_power * base_radius
+    angle = (hash_prefixes % 360) * (np.pi / 180.0)
+    jitter = np.random.default_rng(seed).uniform(-0.15, 0.15, len(times))
+    r = np.maximum(0.0, r_max + jitter)
+
+    positions = np.empty((len(times), 3), dtype=np.float64)
+    positions[:, 0] = r * np.cos(angle)
+    positions[:, 1] = r * np.sin(angle)
+    positions[:, 2] = z_norm * height
+    return positions
+
+
+PENTAGON_SPACING = 3.0  # 同じ世代のコミットの横方向の間隔
+PENTAGON_LEVEL_HEIGHT = 2.5
+
+
+def pentagon_edge_points(major_radius, angle):
+    """5角形（外接円の半径 major_radius、頂点は 72 度おき）の辺と、中心からの半直線の交点"""
+    sector_angle = 2 * np.pi / 5
+    angle = np.mod(angle, 2 * np.pi)
+    sector = np.minimum(np.floor(angle / sector_angle), 4)
+    # 辺の中点方向からのずれで距離が決まる
+    r = major_radius * np.cos(sector_angle / 2) / np.cos(angle - (sector + 0.5) * sector_angle)
+    return r * np.cos(angle), r * np.sin(angle)
+
+
+def pentagon_layout(graph, spacing=PENTAGON_SPACING, level_height=PENTAGON_LEVEL_HEIGHT):
+    """世代ごとに5角形のリング上へ並べる (positions, levels, slots)
+
+    slot は世代の中で中央からいくつ半間隔離れているか（リングの半径 = slot * spacing / 2）。
+    """
+    n = len(graph)
+    parents = graph.parents()
+    # 範囲外に親があるコミットは世代1から始める
+    levels = calculate_depths(parents, initial=graph.external_parents.astype(np.int32).tolist())
+
+    # 世代内の順番（読み込み順）
+    order = np.argsort(levels, kind='stable')
+    sorted_levels = levels[order]
+    starts = np.searchsorted(sorted_levels, sorted_levels, side='left')
+    ends = np.searchsorted(sorted_levels, sorted_levels, side='right')
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n) - starts
+    count = np.empty(n, dtype=np.int64)
+    count[order] = ends - starts
+    slots = np.abs(2 * rank - (count - 1))
+
+    # 角度の番号: 最初の親を辿り、古い方から順に番号を振る
+    first_parents = graph.first_parents.tolist()
+    angle_index = np.full(n, -1, dtype=np.int64)
+    next_index = 0
+    for i in range(n):
+        chain = []
+        j = i
+        while j >= 0 and angle_index[j] < 0:
+            chain.append(j)
+            j = first_parents[j]
+        for j in reversed(chain):
+            angle_index[j] = next_index
+            next_index += 1
+
+    x, y = pentagon_edge_points(slots * (spacing / 2), np.radians(45 * angle_index))
+    # 世代ごとに 45 度回転
+    rotation = np.radians(45 * levels)
+    cos_r, sin_r = np.cos(rotation), np.sin(rotation)
+    positions = np.column_stack((x * cos_r - y * sin_r, x * sin_r + y * cos_r, levels * level_height))
+    return positions, levels, slots
+
+
+@register_engine
+class BranchEngine(LayoutEngine):
+    name = 'BRANCH'
+    label = "Branch Lanes"
+    description = "Depth as height and active lanes arranged around the trunk"
+
+    def layout(self, graph, **options):
+        parents = graph.parents()
+        depths = graph.depths if graph.depths is not None else calculate_depths(parents)
+        lanes, _ = assign_active_lanes(parents, depths, np.argsort(depths, kind='stable'))
+        raw = branch_raw_positions(depths, lanes, options.get("branch_spacing", 1.0), options.get("commit_spacing", 1.0))
+        positions = fit_positions(raw, options.get("max_x", 5.0), options.get("max_y", 5.0), options.get("max_z", 10.0))
+        return LayoutResult(positions, graph.edges(), lanes, {"depths": depths})
+
+
+@register_engine
+class TreeEngine(LayoutEngine):
+    name = 'TREE'
+    label = "Time Cone"
+    description = "Commit time as height, hash as angle, narrowing towards the newest commits"
+
+    def layout(self, graph, **options):
+        positions = tree_positions(
+            graph.times,
+            graph.hash_prefixes,
+            seed=options.get("seed", 0),
+            height=options.get("max_z", 6.0),
+            base_radius=options.get("max_x", 2.0),
+        )
+        return LayoutResult(positions, graph.edges())
+
+
+@register_engine
+class PentagonEngine(LayoutEngine):
+    name = 'PENTAGON'
+    label = "Pentagon Rings"
+    description = "Generations stacked as rotated pentagonal rings"
+
+    def layout(self, graph, **options):
+        positions, levels, slots = pentagon_layout(
+            graph,
+            spacing=options.get("spacing", PENTAGON_SPACING),
+            level_height=options.get("level_height", PENTAGON_LEVEL_HEIGHT),
+        )
+        return LayoutResult(positions, graph.edges(), extras={"levels": levels, "slots": slots})
@@ -0,0 +1,72 @@
+import subprocess
+from dataclasses import dataclass
+
+# 1コミットあたりのおおよそのコスト（目安）
+SPHERE_VERTICES = 482  # primitive_uv_sphere_add の既定 (32 x 16)
+TEXT_VERTICES = 200  # 件名1行分のテキスト
+RING_VERTICES = 15  # 5 x 3 の葉のリング
+RING_FACES = 15
+EDGE_VERTICES = 2 * 16  # bevel 付きの2点カーブ
+OPS_OBJECT_SECONDS = 0.004  # bpy.ops でのプリミティブ追加（シーン更新込み）
+DATA_OBJECT_SECONDS = 0.0008
+MATERIAL_SECONDS = 0.0005
+VERTEX_SECONDS = 0.00000005  # foreach_set での頂点の書き込み
+
+
+@dataclass
+class Estimate:
+    commits: int
+    objects: int
+    materials: int
+    vertices: int
+    seconds: float
+    rings: int = 0
+    leaf_faces: int = 0
+
+    def exceeds(self, max_objects):
+        return self.objects > max_objects
+
+
+def count_commits(repo_path, depth, log_filter):
+    """git rev-list --count で実際に読み込まれるコミット数を数える"""
+    output = subprocess.check_output(
+        ["git", "rev-list", "--count", f"--max-count={depth}", *log_filter.rev_args(), *log_filter.path_args()],
+        cwd=repo_path,
+        encoding="utf-8",
+        text=True,
+    )
+    return int(output.strip() or 0)
+
+
+def estimate_build(commits, layout_engine="PENTAGON"):
+    """tree_generator.generate が作るオブジェクト数などを見積もる
+
+    1コミットにつき球・テキスト・親への辺がおおよそ1つずつとして概算する。
+    5角形エンジンでは葉のリングを全世代で1つのメッシュにまとめ、幹を1つ足す。
+    リングは世代ごとに slot の種類だけ（世代内のコミット数の約半分）できるので、
+    最大でコミット数の半分とみなす。
+    """
+    edges = commits
+    rings = commits // 2 if layout_engine == "PENTAGON" else 0
+    # 葉のメッシュ（bpy.data）と幹（bpy.ops）が1つずつ、マテリアルも1つずつ
+    leaves = 1 if rings else 0
+    objects = commits * 2 + edges + 2 * leaves
+    # 球と辺それぞれにマテリアルを作る
+    materials = commits + edges + 2 * leaves
+    leaf_vertices = rings * RING_VERTICES
+    vertices = commits * (SPHERE_VERTICES + TEXT_VERTICES) + edges * EDGE_VERTICES + leaf_vertices
+    seconds = (
+        (commits * 2 + leaves) * OPS_OBJECT_SECONDS
+        + (edges + leaves) * DATA_OBJECT_SECONDS
+        + leaf_vertices * VERTEX_SECONDS
+        + materials * MATERIAL_SECONDS
+    )
+    return Estimate(commits, objects, materials, vertices, seconds, rings, rings * RING_FACES)
+
+
+def recommend_commit_count(estimate, max_objects):
+    """上限に収まるコミット数（収まっていればそのまま）"""
+    if not estimate.exceeds(max_objects):
+        return estimate.commits
+    per_commit = estimate.objects / max(1, estimate.commits)
+    return max(1, int(max_objects / per_commit))
@@ -1,162 +1,76 @@
 import math
 import bpy
+import numpy as np
 from .git_parser import Commit
+from .layout_engines import GraphArrays, get_engine, PENTAGON_LEVEL_HEIGHT, PENTAGON_SPACING
 
-def get_pentagon_edge_point(major_radius, angle):
-    """5角形の辺上の点を取得（中心から指定された角度方向）"""
-    # 5角形の頂点の角度（72度間隔）
-    pentagon_angles = [math.radians(72 * i) for i in range(5)]
-    
-    # 5角形の頂点座標
-    vertices = [(major_radius * math.cos(a), major_radius * math.sin(a)) for a in pentagon_angles]
-    
-    # 角度を0-360度の範囲に正規化
-    angle = angle % (2 * math.pi)
-    
-    # どの辺と交わるかを判定
-    for i in range(5):
-        v1 = vertices[i]
-        v2 = vertices[(i + 1) % 5]
-        
-        # 辺の角度範囲
-        a1 = pentagon_angles[i]
-        a2 = pentagon_angles[(i + 1) % 5]
-        if a2 < a1:
-            a2 += 2 * math.pi
-        
-        # 角度が辺の範囲内かチェック
-        angle_check = angle
-        if angle < a1 and a2 > 2 * math.pi:
-            angle_check += 2 * math.pi
-        
-        if a1 <= angle_check <= a2:
-            # 中心から角度方向の直線と辺の交点を計算
-            # 辺の方程式: P = v1 + t * (v2 - v1)
-            # 中心からの直線: P = s * (cos(angle), sin(angle))
-            
-            dx = v2[0] - v1[0]
-            dy = v2[1] - v1[1]
-            
-            cos_a = math.cos(angle)
-            sin_a = math.sin(angle)
-            
-            # 交点を求める
-            # v1[0] + t * dx = s * cos_a
-            # v1[1] + t * dy = s * sin_a
-            
-            denom = dx * sin_a - dy * cos_a
-            if abs(denom) > 1e-10:
-                t = (v1[1] * cos_a - v1[0] * sin_a) / denom
-                x = v1[0] + t * dx
-                y = v1[1] + t * dy
-                return (x, y)
-    
-    # フォールバック：外接円上の点
-    return (major_radius * math.cos(angle), major_radius * math.sin(angle))
+LEVEL_HEIGHT = PENTAGON_LEVEL_HEIGHT
+SLOT_WIDTH = PENTAGON_SPACING / 2  # slot は中央からの半間隔数
+# 5角形以外のエンジンに渡す配置の範囲（球の半径 0.5 に合わせた大きさ）
+ENGINE_OPTIONS = {"max_x": 10.0, "max_y": 10.0, "max_z": 40.0}
+RING_SEGMENTS = 5  # 5角形
+RING_MINOR_SEGMENTS = 3
+RING_MINOR_RADIUS = 0.3
 
-def generate(commits: list[Commit]):
-    positions = {}
-    levels = {}
-    
-    # 各コミットのレベル（世代）を計算
-    def calculate_level(commit_hash, current_commits):
-        if commit_hash in levels:
-            return levels[commit_hash]
-        
-        commit = next((c for c in current_commits if c.hash == commit_hash), None)
-        if not commit or not commit.parents:
-            levels[commit_hash] = 0
-            return 0
-        
-        parent_levels = [calculate_level(p, current_commits) for p in commit.parents]
-        level = max(parent_levels) + 1 if parent_levels else 0
-        levels[commit_hash] = level
-        return level
-    
-    # 全コミットのレベルを計算
-    for commit in commits:
-        calculate_level(commit.hash, commits)
+def ring_geometry(ring_keys, minor_radius=RING_MINOR_RADIUS):
+    """(level, slot) ごとの5角形リングを1つの頂点・面配列にまとめて作る
     
-    # レベルごとにコミットをグループ化
-    level_commits = {}
-    for commit in commits:
-        level = levels[commit.hash]
-        if level not in level_commits:
-            level_commits[level] = []
-        level_commits[level].append(commit)
+    primitive_torus_add(major_segments=5, minor_segments=3) と同じ形で、
+    世代ごとの 45 度回転も頂点に焼き込む。
+    """
+    keys = np.asarray(ring_keys, dtype=np.int64).reshape(-1, 2)
+    levels = keys[:, 0].astype(np.float64)
+    major = keys[:, 1] * SLOT_WIDTH
     
-    # 位置を割り当て（横: インデックス、縦: レベル）
-    # X軸は中央揃え
-    for level, level_commit_list in level_commits.items():
-        num_commits = len(level_commit_list)
-        for i, commit in enumerate(level_commit_list):
-            x = (i - (num_commits - 1) / 2) * 3.0
-            z = level * 2.5
-            positions[commit.hash] = (x, 0, z)
+    theta = 2 * np.pi * np.arange(RING_SEGMENTS) / RING_SEGMENTS
+    theta = theta[None, :] + np.radians(45 * levels)[:, None]  # (K, 5)
+    phi = 2 * np.pi * np.arange(RING_MINOR_SEGMENTS) / RING_MINOR_SEGMENTS  # (3,)
     
-    # 各コミットの角度インデックスを計算（親から継承）
-    angle_indices = {}
-    global_index = [0]  # グローバルカウンター
+    # 中心からの距離 (K, 1, 3) と方向 (K, 5, 1)
+    distance = major[:, None, None] + minor_radius * np.cos(phi)[None, None, :]
+    x = distance * np.cos(theta)[:, :, None]
+    y = distance * np.sin(theta)[:, :, None]
+    z = np.broadcast_to(levels[:, None, None] * LEVEL_HEIGHT + minor_radius * np.sin(phi)[None, None, :], x.shape)
+    verts = np.stack((x, y, z), axis=-1).reshape(-1, 3)
     
-    def assign_angle_index(commit_hash, current_commits):
-        if commit_hash in angle_indices:
-            return angle_indices[commit_hash]
-        
-        commit = next((c for c in current_commits if c.hash == commit_hash), None)
-        if not commit:
-            return 0
-        
-        # 親がいない場合は新しいインデックスを割り当て
-        if not commit.parents:
-            angle_indices[commit_hash] = global_index[0]
-            global_index[0] += 1
-            return angle_indices[commit_hash]
-        
-        # 親のインデックスを取得（複数の親がいる場合は最初の親）
-        parent_hash = commit.parents[0]
-        parent_index = assign_angle_index(parent_hash, current_commits)
-        
-        # 親のインデックスの次を使用
-        angle_indices[commit_hash] = global_index[0]
-        global_index[0] += 1
-        return angle_indices[commit_hash]
-    
-    # 全コミットの角度インデックスを計算
-    for commit in commits:
-        assign_angle_index(commit.hash, commits)
+    # 1リング分の四角形（テンプレート）をリングごとにずらす
+    i, j = np.meshgrid(np.arange(RING_SEGMENTS), np.arange(RING_MINOR_SEGMENTS), indexing='ij')
+    i2, j2 = (i + 1) % RING_SEGMENTS, (j + 1) % RING_MINOR_SEGMENTS
+    m = RING_MINOR_SEGMENTS
+    template = np.stack((i * m + j, i2 * m + j, i2 * m + j2, i * m + j2), axis=-1).reshape(-1, 4)
+    per_ring = RING_SEGMENTS * RING_MINOR_SEGMENTS
+    faces = template[None, :, :] + (np.arange(len(keys)) * per_ring)[:, None, None]
+    return verts, faces.reshape(-1, 4)
+
+def add_leaf_rings(ring_keys, material):
+    """全世代の葉のリングを1つのメッシュオブジェクトとして追加する"""
+    verts, faces = ring_geometry(ring_keys)
+    mesh = bpy.data.meshes.new("Tree_Leaves")
+    mesh.vertices.add(len(verts))
+    mesh.vertices.foreach_set("co", verts.astype(np.float32).ravel())
+    mesh.loops.add(faces.size)
+    mesh.loops.foreach_set("vertex_index", faces.astype(np.int32).ravel())
+    mesh.polygons.add(len(faces))
+    mesh.polygons.foreach_set("loop_start", np.arange(0, faces.size, 4, dtype=np.int32))
+    mesh.update()
+    mesh.materials.append(material)
     
-    # ノード（球+トーラス）を作成
-    created_torus = set()  # 作成済みトーラスを記録 (z座標, major_radius)
+    obj = bpy.data.objects.new("Tree_Leaves", mesh)
+    bpy.context.collection.objects.link(obj)
+    return obj
+
+def generate(commits: list[Commit], engine="PENTAGON"):
+    # 配置はレイアウトエンジンに任せ、座標 (N, 3) と辺 (親, 子) の配列を受け取る
+    result = get_engine(engine).layout(GraphArrays.from_commits(commits), **ENGINE_OPTIONS)
+    positions = result.positions
     
-    for commit in commits:
-        if commit.hash not in positions:
-            continue
-        pos = positions[commit.hash]
-        level = levels[commit.hash]
-        
-        # 角度インデックスを取得
-        index = angle_indices[commit.hash]
+    # ノード（球）を作成
+    for i, commit in enumerate(commits):
+        sphere_pos = tuple(positions[i].tolist())
         
         # 球の半径
         sphere_radius = 0.5
         
-        # トーラスの半径を計算
-        major_radius = abs(pos[0])
-        
-        # 45度間隔で角度を決定
-        angle = math.radians(45 * index)
-        
-        # 5角形の辺上の点を取得（回転なし）
-        sphere_x_base, sphere_y_base = get_pentagon_edge_point(major_radius, angle)
-        
-        # トーラスの回転角度を適用
-        rotation_angle = math.radians(45 * level)
-        cos_rot = math.cos(rotation_angle)
-        sin_rot = math.sin(rotation_angle)
-        sphere_x = sphere_x_base * cos_rot - sphere_y_base * sin_rot
-        sphere_y = sphere_x_base * sin_rot + sphere_y_base * cos_rot
-        sphere_pos = (sphere_x, sphere_y, pos[2])
-        
         # 球を作成（オーナメント）
         bpy.ops.mesh.primitive_uv_sphere_add(radius=sphere_radius, location=sphere_pos)
         sphere = bpy.context.active_object
@@ -191,56 +105,6 @@ def generate(commits: list[Commit]):
         # 球にマテリアルを適用
         sphere.data.materials.append(mat)
         
-        # トーラスを作成（X=0の位置に配置、外周が球の位置に来るように）
-        # major_radiusは球までの距離
-        # minor_radiusは管の太さ
-        minor_radius = 0.3
-        
-        # トーラスの中心はX=0, Y=0, Z座標は球と同じ
-        torus_pos = (0, 0, pos[2])
-        torus_key = (pos[2], major_radius)
-        
-        # major_radiusが0より大きく、まだ作成されていない場合のみトーラスを作成
-        if major_radius > 0 and torus_key not in created_torus:
-            bpy.ops.mesh.primitive_torus_add(
-                major_radius=major_radius,
-                minor_radius=minor_radius,
-                location=torus_pos,
-                major_segments=5,  # 5角形に変更
-                minor_segments=3
-            )
-            torus = bpy.context.active_object
-            torus.name = f"Commit_Torus_{commit.hash[:7]}"
-            
-            # 世代ごとに45度回転
-            torus.rotation_euler[2] = math.radians(45 * level)
-            
-            # 葉のマテリアルを作成
-            leaf_mat = bpy.data.materials.new(name=f"Leaf_{commit.hash[:7]}")
-            leaf_mat.use_nodes = True
-            leaf_nodes = leaf_mat.node_tree.nodes
-            leaf_nodes.clear()
-            
-            # Principled BSDFノードを追加
-            leaf_bsdf = leaf_nodes.new(type='ShaderNodeBsdfPrincipled')
-            leaf_bsdf.location = (0, 0)
-            
-            # 緑色の葉
-            leaf_bsdf.inputs['Base Color'].default_value = (0.1, 0.6, 0.2, 1.0)
-            leaf_bsdf.inputs['Roughness'].default_value = 0.7
-            
-            # マテリアル出力ノード
-            leaf_output = leaf_nodes.new(type='ShaderNodeOutputMaterial')
-            leaf_output.location = (200, 0)
-            
-            # ノードを接続
-            leaf_mat.node_tree.links.new(leaf_bsdf.outputs['BSDF'], leaf_output.inputs['Surface'])
-            
-            # トーラスにマテリアルを適用
-            torus.data.materials.append(leaf_mat)
-            
-            created_torus.add(torus_key)
-        
         # テキストを追加（球の位置に合わせる）
         bpy.ops.object.text_add(location=(sphere_pos[0], sphere_pos[1], sphere_pos[2] + 0.5))
         text = bpy.context.active_object
@@ -250,12 +114,42 @@ def generate(commits: list[Commit]):
         text.name = f"Text_{commit.hash[:7]}"
         text.rotation_euler[0] = math.pi / 2
     
+    # 葉のリング（世代と slot の整数キーで重複を除いてまとめて作る。5角形エンジンのみ）
+    ring_keys = set()
+    if "levels" in result.extras:
+        levels = result.extras["levels"].tolist()
+        slots = result.extras["slots"].tolist()
+        ring_keys = {(level, slot) for level, slot in zip(levels, slots) if slot > 0}
+    
+    if ring_keys:
+        # 葉のマテリアル（全リングで共有）
+        leaf_mat = bpy.data.materials.new(name="Leaf_Material")
+        leaf_mat.use_nodes = True
+        leaf_nodes = leaf_mat.node_tree.nodes
+        leaf_nodes.clear()
+        
+        # Principled BSDFノードを追加
+        leaf_bsdf = leaf_nodes.new(type='ShaderNodeBsdfPrincipled')
+        leaf_bsdf.location = (0, 0)
+        
+        # 緑色の葉
+        leaf_bsdf.inputs['Base Color'].default_value = (0.1, 0.6, 0.2, 1.0)
+        leaf_bsdf.inputs['Roughness'].default_value = 0.7
+        
+        # マテリアル出力ノード
+        leaf_output = leaf_nodes.new(type='ShaderNodeOutputMaterial')
+        leaf_output.location = (200, 0)
+        
+        # ノードを接続
+        leaf_mat.node_tree.links.new(leaf_bsdf.outputs['BSDF'], leaf_output.inputs['Surface'])
+        
+        add_leaf_rings(sorted(ring_keys), leaf_mat)
+    
     # 中央に幹を追加
-    if positions:
+    if len(positions):
         # 最小・最大のZ座標を取得
-        z_coords = [pos[2] for pos in positions.values()]
-        min_z = min(z_coords)
-        max_z = max(z_coords)
+        min_z = float(positions[:, 2].min())
+        max_z = float(positions[:, 2].max())
         
         # 下に2世代分伸ばす
         trunk_bottom_z = min_z - 2 * 2.5
@@ -297,80 +191,45 @@ def generate(commits: list[Commit]):
         trunk.data.materials.append(trunk_mat)
     
     # 親子関係を線で結ぶ
-    for commit in commits:
-        if commit.hash not in positions:
-            continue
+    for parent, child in result.edges.tolist():
+        commit = commits[child]
+        parent_hash = commits[parent].hash
+        child_pos = positions[child]
+        parent_pos = positions[parent]
+        
+        curve_data = bpy.data.curves.new(name=f"Edge_{commit.hash[:7]}_to_{parent_hash[:7]}", type='CURVE')
+        curve_data.dimensions = '3D'
+        curve_data.bevel_depth = 0.15
+        
+        polyline = curve_data.splines.new('POLY')
+        polyline.points.add(1)
+        polyline.points[0].co = (child_pos[0], child_pos[1], child_pos[2], 1)
+        polyline.points[1].co = (parent_pos[0], parent_pos[1], parent_pos[2], 1)
+        
+        curve_obj = bpy.data.objects.new(f"Edge_{commit.hash[:7]}", curve_data)
+        bpy.context.collection.objects.link(curve_obj)
+        
+        # 枝のマテリアルを作成
+        branch_mat = bpy.data.materials.new(name=f"Branch_{commit.hash[:7]}")
+        branch_mat.use_nodes = True
+        branch_nodes = branch_mat.node_tree.nodes
+        branch_nodes.clear()
         
-        # 子の位置を計算
-        pos = positions[commit.hash]
-        index = angle_indices[commit.hash]
-        level = levels[commit.hash]
-        major_radius = abs(pos[0])
-        angle = math.radians(45 * index)
-        child_x_base, child_y_base = get_pentagon_edge_point(major_radius, angle)
+        # Principled BSDFノードを追加
+        branch_bsdf = branch_nodes.new(type='ShaderNodeBsdfPrincipled')
+        branch_bsdf.location = (0, 0)
+        
+        # 茶色の枝
+        branch_bsdf.inputs['Base Color'].default_value = (0.4, 0.25, 0.1, 1.0)
+        branch_bsdf.inputs['Roughness'].default_value = 0.8
         
-        # トーラスの回転角度を適用
-        rotation_angle = math.radians(45 * level)
-        cos_rot = math.cos(rotation_angle)
-        sin_rot = math.sin(rotation_angle)
-        child_x = child_x_base * cos_rot - child_y_base * sin_rot
-        child_y = child_x_base * sin_rot + child_y_base * cos_rot
-        child_pos = (child_x, child_y, pos[2])
+        # マテリアル出力ノード
+        branch_output = branch_nodes.new(type='ShaderNodeOutputMaterial')
+        branch_output.location = (200, 0)
+        
+        # ノードを接続
+        branch_mat.node_tree.links.new(branch_bsdf.outputs['BSDF'], branch_output.inputs['Surface'])
         
-        for parent_hash in commit.parents:
-            if parent_hash not in positions:
-                continue
-            
-            # 親の位置を計算
-            parent_pos_orig = positions[parent_hash]
-            parent_index = angle_indices[parent_hash]
-            parent_level = levels[parent_hash]
-            parent_major_radius = abs(parent_pos_orig[0])
-            parent_angle = math.radians(45 * parent_index)
-            parent_x_base, parent_y_base = get_pentagon_edge_point(parent_major_radius, parent_angle)
-            
-            # トーラスの回転角度を適用
-            parent_rotation_angle = math.radians(45 * parent_level)
-            parent_cos_rot = math.cos(parent_rotation_angle)
-            parent_sin_rot = math.sin(parent_rotation_angle)
-            parent_x = parent_x_base * parent_cos_rot - parent_y_base * parent_sin_rot
-            parent_y = parent_x_base * parent_sin_rot + parent_y_base * parent_cos_rot
-            parent_pos = (parent_x, parent_y, parent_pos_orig[2])
-            
-            curve_data = bpy.data.curves.new(name=f"Edge_{commit.hash[:7]}_to_{parent_hash[:7]}", type='CURVE')
-            curve_data.dimensions = '3D'
-            curve_data.bevel_depth = 0.15
-            
-            polyline = curve_data.splines.new('POLY')
-            polyline.points.add(1)
-            polyline.points[0].co = (child_pos[0], child_pos[1], child_pos[2], 1)
-            polyline.points[1].co = (parent_pos[0], parent_pos[1], parent_pos[2], 1)
-            
-            curve_obj = bpy.data.objects.new(f"Edge_{commit.hash[:7]}", curve_data)
-            bpy.context.collection.objects.link(curve_obj)
-            
-            # 枝のマテリアルを作成
-            branch_mat = bpy.data.materials.new(name=f"Branch_{commit.hash[:7]}")
-            branch_mat.use_nodes = True
-            branch_nodes = branch_mat.node_tree.nodes
-            branch_nodes.clear()
-            
-            # Principled BSDFノードを追加
-            branch_bsdf = branch_nodes.new(type='ShaderNodeBsdfPrincipled')
-            branch_bsdf.location = (0, 0)
-            
-            # 茶色の枝
-            branch_bsdf.inputs['Base Color'].default_value = (0.4, 0.25, 0.1, 1.0)
-            branch_bsdf.inputs['Roughness'].default_value = 0.8
-            
-            # マテリアル出力ノード
-            branch_output = branch_nodes.new(type='ShaderNodeOutputMaterial')
-            branch_output.location = (200, 0)
-            
-            # ノードを接続
-            branch_mat.node_tree.links.new(branch_bsdf.outputs['BSDF'], branch_output.inputs['Surface'])
-            
-            # カーブにマテリアルを適用
-            curve_obj.data.materials.append(branch_mat)
+        # カーブにマテリアルを適用
+        curve_obj.data.materials.append(branch_mat)
 
-    
\ No newline at end of file
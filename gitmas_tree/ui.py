@@ -12,4 +12,19 @@ class GITMASTREE_PT_panel(bpy.types.Panel):
         scene = context.scene
         layout.prop(scene, "gitmas_repo_path", text="Repository")
         layout.prop(scene, "gitmas_commits_count", text="Commit Count")
+        layout.prop(scene, "gitmas_layout_engine")
+
+        box = layout.box()
+        box.label(text="履歴の絞り込み")
+        box.prop(scene, "gitmas_since")
+        box.prop(scene, "gitmas_until")
+        box.prop(scene, "gitmas_include_refs")
+        box.prop(scene, "gitmas_exclude_refs")
+        box.prop(scene, "gitmas_pathspec")
+        box.prop(scene, "gitmas_first_parent")
+        box = layout.box()
+        box.prop(scene, "gitmas_preflight")
+        row = box.row()
+        row.enabled = scene.gitmas_preflight
+        row.prop(scene, "gitmas_max_objects")
         layout.operator(GITMASTREE_OT_generate.bl_idname)
\ No newline at end of file
@@ -0,0 +1,39 @@
+import subprocess
+import pytest
+from git_xmas_tree.commit_graph import load_commits_from_graph
+
+
+def git(repo, *args):
+    return subprocess.check_output(["git", *args], cwd=repo, encoding="utf-8", text=True)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    git(tmp_path, "init", "-q", "-b", "main")
+    git(tmp_path, "config", "user.name", "test")
+    git(tmp_path, "config", "user.email", "test@example.com")
+    for i in range(3):
+        git(tmp_path, "commit", "-q", "--allow-empty", "-m", f"m{i}")
+    return tmp_path
+
+
+def test_stale_graph_skips_commits_of_deleted_branch(repo):
+    git(repo, "checkout", "-q", "-b", "gone")
+    git(repo, "commit", "-q", "--allow-empty", "-m", "unreachable")
+    git(repo, "checkout", "-q", "main")
+    git(repo, "commit-graph", "write", "--reachable")
+    git(repo, "branch", "-q", "-D", "gone")
+
+    commits, depths = load_commits_from_graph(repo)
+    expected = set(git(repo, "rev-list", "--all").split())
+    assert depths is not None
+    assert {c.hash for c in commits} == expected
+
+
+def test_detached_head_counts_as_tip(repo):
+    git(repo, "checkout", "-q", "--detach")
+    git(repo, "commit", "-q", "--allow-empty", "-m", "detached")
+    git(repo, "commit-graph", "write", "--reachable")
+
+    commits, _ = load_commits_from_graph(repo)
+    assert git(repo, "rev-parse", "HEAD").strip() in {c.hash for c in commits}
@@ -0,0 +1,33 @@
+from git_xmas_tree.git_parser import Commit
+from git_xmas_tree.layout import BranchLayout
+
+
+def fork_history():
+    """m1 → m2 → m3 → m4 → merge、f1 は m2 から分岐して m3 より新しい"""
+    def commit(name, parents, time):
+        return Commit(name * 40, [p * 40 for p in parents], time, "", "")
+    return [
+        commit("1", [], 100),
+        commit("2", ["1"], 200),
+        commit("3", ["2"], 300),
+        commit("f", ["2"], 400),
+        commit("4", ["3"], 500),
+        commit("5", ["4", "f"], 600),
+    ]
+
+
+def lanes_by_hash(commits):
+    layout = BranchLayout(commits)
+    return {c.hash[0]: lane for c, lane in zip(commits, layout.lanes.tolist())}
+
+
+def test_fork_keeps_first_parent_trunk_on_lane_zero():
+    lanes = lanes_by_hash(fork_history())
+    assert [lanes[name] for name in "12345"] == [0, 0, 0, 0, 0]
+    assert lanes["f"] != 0
+
+
+def test_fork_lanes_do_not_depend_on_load_order():
+    commits = fork_history()
+    reordered = [commits[0], commits[1], commits[3], commits[2], commits[4], commits[5]]
+    assert lanes_by_hash(commits) == lanes_by_hash(reordered)
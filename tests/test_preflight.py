@@ -0,0 +1,34 @@
+from git_xmas_tree.preflight import estimate_build
+
+
+def test_chunked_estimate_counts_two_objects_per_chunk():
+    full = estimate_build(20000, 50)
+    chunked = estimate_build(20000, 50, chunked=True, chunk_size=5000)
+    assert chunked.objects - estimate_build(0, 0, chunked=True).objects == 2 * 4
+    assert chunked.materials < full.materials
+    assert chunked.seconds < full.seconds
+
+
+def test_engines_without_lanes_have_no_trunk_connectors():
+    branch = estimate_build(1000, 10)
+    tree = estimate_build(1000, 10, layout_engine='TREE')
+    assert branch.objects - tree.objects == 1000 // 2
+
+
+def test_branch_tips_follow_the_ref_filter(tmp_path):
+    import subprocess
+    from git_xmas_tree.git_parser import LogFilter
+    from git_xmas_tree.preflight import count_branch_tips
+
+    def git(*args):
+        subprocess.check_output(["git", *args], cwd=tmp_path)
+    git("init", "-q", "-b", "main")
+    git("-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-q", "--allow-empty", "-m", "m")
+    for name in ("a", "b"):
+        git("checkout", "-q", "-b", f"feature/{name}", "main")
+        git("-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-q", "--allow-empty", "-m", name)
+
+    assert count_branch_tips(tmp_path, LogFilter()) == 3
+    assert count_branch_tips(tmp_path, LogFilter(include_refs=["heads/feature/*"])) == 2
+    assert count_branch_tips(tmp_path, LogFilter(exclude_refs=["heads/feature/a"])) == 2
+    assert count_branch_tips(tmp_path, LogFilter(include_refs=["heads/main"])) == 1
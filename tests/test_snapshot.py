@@ -0,0 +1,33 @@
+import re
+import subprocess
+import pytest
+from git_xmas_tree.snapshot import LAYOUT_NAMES, snapshot_repo
+
+
+def git(repo, *args):
+    return subprocess.check_output(["git", *args], cwd=repo, encoding="utf-8", text=True)
+
+
+@pytest.fixture
+def branched_repo(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git(repo, "init", "-q", "-b", "main")
+    git(repo, "config", "user.name", "test")
+    git(repo, "config", "user.email", "test@example.com")
+    for i in range(3):
+        git(repo, "commit", "-q", "--allow-empty", "-m", f"m{i}")
+    git(repo, "checkout", "-q", "-b", "feature", "HEAD~1")
+    for i in range(2):
+        git(repo, "commit", "-q", "--allow-empty", "-m", f"f{i}")
+    git(repo, "checkout", "-q", "main")
+    return repo
+
+
+@pytest.mark.parametrize("layout_name", LAYOUT_NAMES)
+def test_nodes_are_colored_by_branch(branched_repo, tmp_path, layout_name):
+    out = tmp_path / f"{layout_name}.svg"
+    snapshot_repo(str(branched_repo), str(out), layout_name=layout_name)
+    fills = re.findall(r'<circle [^>]*fill="(#[0-9a-f]{6})"', out.read_text())
+    assert len(fills) == 5
+    assert len(set(fills)) > 1